@@ -0,0 +1,143 @@
+"""initial schema
+
+Matches the tables previously created by Base.metadata.create_all. Databases
+that were bootstrapped that way should run `alembic stamp 0001` once instead
+of upgrading through this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('profile_picture_url', sa.String(), nullable=True),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'groups',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('group_name', sa.String(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('group_id')
+    )
+    op.create_table(
+        'threads',
+        sa.Column('thread_id', sa.Integer(), nullable=False),
+        sa.Column('thread_name', sa.String(), nullable=False),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('thread_id'),
+        sa.UniqueConstraint('thread_name'),
+        sa.UniqueConstraint('thread_name', name='unique_thread_name')
+    )
+    op.create_table(
+        'reviews',
+        sa.Column('review_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('feedback', sa.String(), nullable=True),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('feedback_owner_id', sa.Integer(), nullable=False),
+        sa.Column('photo_url', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['feedback_owner_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('review_id')
+    )
+    op.create_table(
+        'posts',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('photo', sa.String(), nullable=True),
+        sa.Column('profile_user_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('thread_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['profile_user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['thread_id'], ['threads.thread_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_table(
+        'comments',
+        sa.Column('comment_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('photo', sa.String(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=True),
+        sa.Column('review_id', sa.Integer(), nullable=True),
+        sa.Column('parent_comment_id', sa.Integer(), nullable=True),
+        sa.Column('rate', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['parent_comment_id'], ['comments.comment_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.post_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['review_id'], ['reviews.review_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('comment_id')
+    )
+    op.create_table(
+        'messages',
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.Column('photo', sa.String(), nullable=True),
+        sa.Column('date_created', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('receiver_id', sa.Integer(), nullable=True),
+        sa.Column('group_id', sa.Integer(), nullable=True),
+        sa.Column('deleted_for_receiver', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.group_id']),
+        sa.ForeignKeyConstraint(['receiver_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_table(
+        'group_members',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.group_id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+    op.create_table(
+        'group_co_owners',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.group_id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('group_co_owners')
+    op.drop_table('group_members')
+    op.drop_table('messages')
+    op.drop_table('comments')
+    op.drop_table('posts')
+    op.drop_table('reviews')
+    op.drop_table('threads')
+    op.drop_table('groups')
+    op.drop_table('users')
@@ -0,0 +1,53 @@
+"""hot path indexes
+
+Composite indexes matching the filters and date_created ordering used by the
+list routes, plus indexes behind the user foreign keys that ON DELETE CASCADE
+walks when an account is removed. Built concurrently so the tables stay
+writable while the migration runs.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_posts_thread_id_date_created', 'posts', ['thread_id', 'date_created']),
+    ('ix_posts_profile_user_id_date_created', 'posts', ['profile_user_id', 'date_created']),
+    ('ix_posts_user_id', 'posts', ['user_id']),
+    ('ix_comments_post_id_date_created', 'comments', ['post_id', 'date_created']),
+    ('ix_comments_review_id_date_created', 'comments', ['review_id', 'date_created']),
+    ('ix_comments_parent_comment_id', 'comments', ['parent_comment_id']),
+    ('ix_comments_user_id', 'comments', ['user_id']),
+    ('ix_messages_group_id_date_created', 'messages', ['group_id', 'date_created']),
+    ('ix_messages_sender_id_receiver_id_date_created', 'messages', ['sender_id', 'receiver_id', 'date_created']),
+    ('ix_messages_receiver_id_date_created', 'messages', ['receiver_id', 'date_created']),
+    ('ix_reviews_feedback_owner_id', 'reviews', ['feedback_owner_id']),
+    ('ix_reviews_date_created', 'reviews', ['date_created']),
+    ('ix_threads_user_id', 'threads', ['user_id']),
+    ('ix_groups_owner_id', 'groups', ['owner_id']),
+    ('ix_group_members_user_id', 'group_members', ['user_id']),
+    ('ix_group_co_owners_user_id', 'group_co_owners', ['user_id']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
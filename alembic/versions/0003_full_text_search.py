@@ -0,0 +1,54 @@
+"""full text search on posts and reviews
+
+Adds stored tsvector columns generated from posts.content and from
+reviews.name/description, each with a GIN index. Adding a stored generated
+column rewrites the table, so run this off-peak on large databases.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+POST_VECTOR = "to_tsvector('english', coalesce(content, ''))"
+REVIEW_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    op.add_column('posts', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(POST_VECTOR, persisted=True)
+    ))
+    op.add_column('reviews', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(REVIEW_VECTOR, persisted=True)
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_posts_search_vector', 'posts', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_reviews_search_vector', 'reviews', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_search_vector', table_name='reviews', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_posts_search_vector', table_name='posts', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('reviews', 'search_vector')
+    op.drop_column('posts', 'search_vector')
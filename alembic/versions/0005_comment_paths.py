@@ -0,0 +1,56 @@
+"""materialized comment paths
+
+Adds comments.path ('<root id>/.../<own id>/') and comments.depth, backfills
+them for existing rows with a recursive CTE and indexes path for prefix
+(subtree) lookups.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('comments', sa.Column('path', sa.String(), nullable=True))
+    op.add_column('comments', sa.Column('depth', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    op.execute("""
+        WITH RECURSIVE tree AS (
+            SELECT comment_id, comment_id::text || '/' AS path, 0 AS depth
+            FROM comments
+            WHERE parent_comment_id IS NULL
+            UNION ALL
+            SELECT c.comment_id, t.path || c.comment_id::text || '/', t.depth + 1
+            FROM comments c
+            JOIN tree t ON c.parent_comment_id = t.comment_id
+        )
+        UPDATE comments
+        SET path = tree.path, depth = tree.depth
+        FROM tree
+        WHERE comments.comment_id = tree.comment_id
+    """)
+    op.alter_column('comments', 'path', nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_comments_path', 'comments', ['path'],
+            postgresql_ops={'path': 'text_pattern_ops'},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_comments_path', table_name='comments', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('comments', 'depth')
+    op.drop_column('comments', 'path')
@@ -0,0 +1,48 @@
+"""review rating counters
+
+Denormalized comment_count, rate_count and rate_sum on reviews, backfilled
+from the comments table.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('reviews', sa.Column('comment_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('reviews', sa.Column('rate_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('reviews', sa.Column('rate_sum', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+    op.execute("""
+        UPDATE reviews AS r
+        SET comment_count = s.comment_count,
+            rate_count = s.rate_count,
+            rate_sum = s.rate_sum
+        FROM (
+            SELECT review_id,
+                   count(*) AS comment_count,
+                   count(rate) AS rate_count,
+                   coalesce(sum(rate), 0) AS rate_sum
+            FROM comments
+            WHERE review_id IS NOT NULL
+            GROUP BY review_id
+        ) AS s
+        WHERE r.review_id = s.review_id
+    """)
+
+
+def downgrade():
+    op.drop_column('reviews', 'rate_sum')
+    op.drop_column('reviews', 'rate_count')
+    op.drop_column('reviews', 'comment_count')
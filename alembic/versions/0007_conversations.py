@@ -0,0 +1,88 @@
+"""conversations summary table
+
+One row per (user, DM partner) and per (user, group) holding the latest
+message, last activity time and unread count, maintained on message insert.
+Backfilled from existing messages with unread counts starting at zero.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conversations',
+        sa.Column('conversation_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('partner_id', sa.Integer(), nullable=True),
+        sa.Column('group_id', sa.Integer(), nullable=True),
+        sa.Column('last_message_id', sa.Integer(), nullable=True),
+        sa.Column('last_activity_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('unread_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.CheckConstraint('(partner_id IS NULL) <> (group_id IS NULL)', name='ck_conversations_partner_or_group'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['partner_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['group_id'], ['groups.group_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['last_message_id'], ['messages.message_id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('conversation_id')
+    )
+    op.create_index(
+        'uq_conversations_user_id_partner_id', 'conversations', ['user_id', 'partner_id'],
+        unique=True, postgresql_where=sa.text('partner_id IS NOT NULL')
+    )
+    op.create_index(
+        'uq_conversations_user_id_group_id', 'conversations', ['user_id', 'group_id'],
+        unique=True, postgresql_where=sa.text('group_id IS NOT NULL')
+    )
+    op.create_index(
+        'ix_conversations_user_id_last_activity_at', 'conversations',
+        ['user_id', 'last_activity_at', 'conversation_id']
+    )
+
+    # Direct messages: a row for each side of every pair that has talked
+    op.execute("""
+        INSERT INTO conversations (user_id, partner_id, last_message_id, last_activity_at)
+        SELECT user_id, partner_id, max(message_id), max(date_created)
+        FROM (
+            SELECT sender_id AS user_id, receiver_id AS partner_id, message_id, date_created
+            FROM messages
+            WHERE receiver_id IS NOT NULL
+            UNION ALL
+            SELECT receiver_id, sender_id, message_id, date_created
+            FROM messages
+            WHERE receiver_id IS NOT NULL AND receiver_id <> sender_id
+        ) AS m
+        GROUP BY user_id, partner_id
+    """)
+
+    # Groups with messages: a row for each member and the owner
+    op.execute("""
+        INSERT INTO conversations (user_id, group_id, last_message_id, last_activity_at)
+        SELECT gm.user_id, lm.group_id, lm.last_message_id, lm.last_activity_at
+        FROM (
+            SELECT group_id, max(message_id) AS last_message_id, max(date_created) AS last_activity_at
+            FROM messages
+            WHERE group_id IS NOT NULL
+            GROUP BY group_id
+        ) AS lm
+        JOIN (
+            SELECT group_id, user_id FROM group_members
+            UNION
+            SELECT group_id, owner_id FROM groups
+        ) AS gm ON gm.group_id = lm.group_id
+    """)
+
+
+def downgrade():
+    op.drop_table('conversations')
@@ -0,0 +1,28 @@
+"""nullable message sender
+
+Messages sent by a deleted account are kept as "[deleted]" tombstones with
+no sender.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column('messages', 'sender_id', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade():
+    op.execute("DELETE FROM messages WHERE sender_id IS NULL")
+    op.alter_column('messages', 'sender_id', existing_type=sa.Integer(), nullable=False)
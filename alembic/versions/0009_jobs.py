@@ -0,0 +1,56 @@
+"""background jobs table
+
+Durable queue for app/jobs.py. Workers claim queued rows with
+SELECT ... FOR UPDATE SKIP LOCKED.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'jobs',
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('queue', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), server_default=sa.text("'{}'::jsonb"), nullable=False),
+        sa.Column('status', sa.String(), server_default='queued', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), server_default=sa.text('5'), nullable=False),
+        sa.Column('run_after', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('result', postgresql.JSONB(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(
+        'ix_jobs_queue_run_after', 'jobs', ['queue', 'run_after'],
+        postgresql_where=sa.text("status = 'queued'")
+    )
+    op.create_index(
+        'ix_jobs_started_at', 'jobs', ['started_at'],
+        postgresql_where=sa.text("status = 'running'")
+    )
+    op.create_index('ix_jobs_finished_at', 'jobs', ['finished_at'])
+
+
+def downgrade():
+    op.drop_index('ix_jobs_finished_at', table_name='jobs')
+    op.drop_index('ix_jobs_started_at', table_name='jobs')
+    op.drop_index('ix_jobs_queue_run_after', table_name='jobs')
+    op.drop_table('jobs')
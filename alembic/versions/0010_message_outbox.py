@@ -0,0 +1,50 @@
+"""message event outbox
+
+Real-time events written in the same transaction as their message and
+delivered by app/outbox.py. seq is the event sequence number clients use to
+drop duplicates. Pending broadcast_message jobs, which the outbox replaces,
+are deleted.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'message_events',
+        sa.Column('seq', sa.BigInteger(), nullable=False),
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('dispatched_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['message_id'], ['messages.message_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index(
+        'ix_message_events_pending', 'message_events', ['seq'],
+        postgresql_where=sa.text('dispatched_at IS NULL')
+    )
+    op.create_index('ix_message_events_created_at', 'message_events', ['created_at'])
+    # Their handler is gone; left queued they would only fail with "No handler"
+    op.execute("DELETE FROM jobs WHERE kind = 'broadcast_message' AND status IN ('queued', 'running')")
+
+
+def downgrade():
+    op.drop_index('ix_message_events_created_at', table_name='message_events')
+    op.drop_index('ix_message_events_pending', table_name='message_events')
+    op.drop_table('message_events')
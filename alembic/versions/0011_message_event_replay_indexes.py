@@ -0,0 +1,41 @@
+"""message event replay indexes
+
+Per-recipient indexes on the outbox so a reconnecting WebSocket client can
+be sent just the events after its last seen seq. Built concurrently so the
+outbox stays writable while the migration runs.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_message_events_user_id_seq', ['user_id', 'seq'], 'user_id IS NOT NULL'),
+    ('ix_message_events_group_id_seq', ['group_id', 'seq'], 'group_id IS NOT NULL'),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name, 'message_events', columns, postgresql_where=sa.text(where),
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='message_events', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,70 @@
+"""message event dispatch order
+
+Adds message_events.dispatch_seq, taken from its own sequence when the
+outbox dispatcher claims an event. Claims are serialized, so dispatch_seq
+follows commit order where seq (assigned at insert) does not; reconnecting
+WebSocket clients resume from it. Already dispatched rows keep their seq as
+dispatch_seq. The replay indexes move from seq to dispatch_seq, and
+message_id gets an index for resuming by message id.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 10:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+OLD_INDEXES = [
+    ('ix_message_events_user_id_seq', ['user_id', 'seq'], 'user_id IS NOT NULL'),
+    ('ix_message_events_group_id_seq', ['group_id', 'seq'], 'group_id IS NOT NULL'),
+]
+
+NEW_INDEXES = [
+    ('ix_message_events_user_id_dispatch_seq', ['user_id', 'dispatch_seq'], 'user_id IS NOT NULL'),
+    ('ix_message_events_group_id_dispatch_seq', ['group_id', 'dispatch_seq'], 'group_id IS NOT NULL'),
+    ('ix_message_events_dispatch_seq', ['dispatch_seq'], None),
+    ('ix_message_events_message_id', ['message_id'], None),
+]
+
+
+def upgrade():
+    op.execute("CREATE SEQUENCE message_events_dispatch_seq")
+    op.add_column('message_events', sa.Column('dispatch_seq', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE message_events SET dispatch_seq = seq WHERE dispatched_at IS NOT NULL")
+    op.execute("""
+        SELECT setval('message_events_dispatch_seq', coalesce(max(dispatch_seq), 0) + 1, false)
+        FROM message_events
+    """)
+
+    with op.get_context().autocommit_block():
+        for name, columns, where in NEW_INDEXES:
+            op.create_index(
+                name, 'message_events', columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+        for name, _, _ in OLD_INDEXES:
+            op.drop_index(name, table_name='message_events', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns, where in OLD_INDEXES:
+            op.create_index(
+                name, 'message_events', columns, postgresql_where=sa.text(where),
+                postgresql_concurrently=True, if_not_exists=True
+            )
+        for name, _, _ in reversed(NEW_INDEXES):
+            op.drop_index(name, table_name='message_events', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('message_events', 'dispatch_seq')
+    op.execute("DROP SEQUENCE message_events_dispatch_seq")
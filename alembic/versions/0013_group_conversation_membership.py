@@ -0,0 +1,58 @@
+"""group conversations follow membership
+
+Group chat list rows are now created when a user joins a group and deleted
+when they are removed, not only on the next message. Backfills a row for
+every member and owner without one and deletes the rows of ex-members.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        DELETE FROM conversations AS c
+        WHERE c.group_id IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM group_members AS gm
+              WHERE gm.group_id = c.group_id AND gm.user_id = c.user_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM groups AS g
+              WHERE g.group_id = c.group_id AND g.owner_id = c.user_id
+          )
+    """)
+
+    op.execute("""
+        INSERT INTO conversations (user_id, group_id, last_message_id, last_activity_at)
+        SELECT p.user_id, p.group_id, lm.last_message_id, coalesce(lm.last_activity_at, g.date_created)
+        FROM (
+            SELECT group_id, user_id FROM group_members
+            UNION
+            SELECT group_id, owner_id FROM groups
+        ) AS p
+        JOIN groups AS g ON g.group_id = p.group_id
+        LEFT JOIN (
+            SELECT group_id, max(message_id) AS last_message_id, max(date_created) AS last_activity_at
+            FROM messages
+            WHERE group_id IS NOT NULL
+            GROUP BY group_id
+        ) AS lm ON lm.group_id = p.group_id
+        ORDER BY p.user_id
+        ON CONFLICT (user_id, group_id) WHERE group_id IS NOT NULL DO NOTHING
+    """)
+
+
+def downgrade():
+    # Rows for groups without messages are harmless to keep
+    pass
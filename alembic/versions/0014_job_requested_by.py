@@ -0,0 +1,34 @@
+"""job requester
+
+Records the user who started each job, so GET /jobs/{job_id} can be limited
+to them and to admins. Existing jobs have no requester and are left to
+admins.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 11:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('jobs', sa.Column('requested_by', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'jobs_requested_by_fkey', 'jobs', 'users', ['requested_by'], ['user_id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_jobs_requested_by', 'jobs', ['requested_by'])
+
+
+def downgrade():
+    op.drop_index('ix_jobs_requested_by', table_name='jobs')
+    op.drop_constraint('jobs_requested_by_fkey', 'jobs', type_='foreignkey')
+    op.drop_column('jobs', 'requested_by')
@@ -0,0 +1,106 @@
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from . import membership, models, oauth2
+from .jobs import handler
+from .aggregates import reconcile_review_aggregates
+from .config import settings
+from .database import SessionLocal
+
+# Account deletion, run as a "delete_user" job enqueued by DELETE /users/{id}.
+
+
+def tombstone_sent_messages(db: Session, user_id: int, batch_size: int) -> int:
+    """Blank the user's sent messages in committed batches of message ids."""
+    tombstoned = 0
+    while True:
+        batch = select(models.Message.message_id).where(
+            models.Message.sender_id == user_id
+        ).limit(batch_size)
+        count = db.execute(
+            update(models.Message)
+            .where(models.Message.message_id.in_(batch))
+            .values(content="[deleted]", photo=None, sender_id=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        tombstoned += count
+        if count < batch_size:
+            return tombstoned
+
+
+def delete_account(db: Session, user_id: int, batch_size: int = None) -> dict:
+    """Delete a user and everything that goes with the account.
+
+    Sent messages are tombstoned first in batches, which is safe to repeat if
+    the job is retried. Group hand-over, membership cleanup and the user row
+    itself then go in a single transaction; posts, threads, reviews,
+    comments, received messages and conversations follow through ON DELETE
+    CASCADE.
+    """
+    batch_size = batch_size or settings.account_deletion_batch_size
+    tombstoned = tombstone_sent_messages(db, user_id, batch_size)
+
+    # Reviews whose counters lose the user's comments (and their replies)
+    review_ids = set(db.execute(
+        select(models.Comment.review_id).distinct().where(
+            models.Comment.user_id == user_id,
+            models.Comment.review_id.isnot(None)
+        )
+    ).scalars())
+
+    co_owners = models.group_co_owners
+    other_co_owner = select(func.min(co_owners.c.user_id)).where(
+        co_owners.c.group_id == models.Group.group_id,
+        co_owners.c.user_id != user_id
+    ).scalar_subquery()
+
+    # Owned groups with another co-owner go to the lowest co-owner id
+    transferred = db.execute(
+        update(models.Group)
+        .where(models.Group.owner_id == user_id, other_co_owner.isnot(None))
+        .values(owner_id=other_co_owner)
+        .returning(models.Group.group_id)
+    ).scalars().all()
+
+    # The rest are deleted with their memberships
+    deleted = db.execute(
+        select(models.Group.group_id).where(models.Group.owner_id == user_id)
+    ).scalars().all()
+    if deleted:
+        db.execute(update(models.Message).where(models.Message.group_id.in_(deleted)).values(group_id=None))
+        db.execute(delete(models.group_members).where(models.group_members.c.group_id.in_(deleted)))
+        db.execute(delete(co_owners).where(co_owners.c.group_id.in_(deleted)))
+        db.execute(delete(models.Group).where(models.Group.group_id.in_(deleted)))
+
+    left = db.execute(
+        delete(models.group_members).where(models.group_members.c.user_id == user_id)
+        .returning(models.group_members.c.group_id)
+    ).scalars().all()
+    left += db.execute(
+        delete(co_owners).where(co_owners.c.user_id == user_id).returning(co_owners.c.group_id)
+    ).scalars().all()
+
+    db.execute(delete(models.User).where(models.User.user_id == user_id))
+    affected_group_ids = sorted(set(transferred) | set(deleted) | set(left))
+    membership.publish_invalidation(db, affected_group_ids)
+    # Other workers would otherwise keep authenticating the deleted user
+    oauth2.publish_principal_invalidation(db, user_id)
+    db.commit()
+
+    reconcile_review_aggregates(db, review_ids)
+
+    return {
+        "messages_tombstoned": tombstoned,
+        "groups_transferred": len(transferred),
+        "groups_deleted": len(deleted),
+        "affected_group_ids": affected_group_ids,
+    }
+
+
+@handler("delete_user", queue="maintenance", max_attempts=3)
+def run_account_deletion(user_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        return delete_account(db, user_id)
+    finally:
+        db.close()
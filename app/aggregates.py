@@ -0,0 +1,98 @@
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, func, text
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+from .jobs import handler
+
+# Denormalized review rating counters (reviews.comment_count, rate_count,
+# rate_sum). Comment routes apply deltas in their own transaction; the
+# reconciliation below recomputes them from the comments table.
+
+
+def apply_review_delta(db: Session, review_id: int, comments: int = 0, rates: int = 0, rate_sum: int = 0):
+    """Adjust a review's counters atomically; the caller commits."""
+    if not (comments or rates or rate_sum):
+        return
+    db.query(models.Review).filter(models.Review.review_id == review_id).update({
+        models.Review.comment_count: models.Review.comment_count + comments,
+        models.Review.rate_count: models.Review.rate_count + rates,
+        models.Review.rate_sum: models.Review.rate_sum + rate_sum,
+    }, synchronize_session=False)
+
+
+def delete_comment_rows(db: Session, criterion) -> int:
+    """Delete the matching comments and take them off their reviews' counters; the caller commits.
+
+    The deltas come from the rows actually deleted, so whatever review each
+    one belongs to is adjusted, not just the review of the first comment.
+    """
+    deleted = db.execute(
+        delete(models.Comment).where(criterion)
+        .returning(models.Comment.review_id, models.Comment.rate)
+        .execution_options(synchronize_session=False)
+    ).all()
+    deltas = {}
+    for review_id, rate in deleted:
+        if review_id is None:
+            continue
+        comments, rates, rate_sum = deltas.get(review_id, (0, 0, 0))
+        deltas[review_id] = (comments + 1, rates + (rate is not None), rate_sum + (rate or 0))
+    for review_id, (comments, rates, rate_sum) in sorted(deltas.items()):
+        apply_review_delta(db, review_id, comments=-comments, rates=-rates, rate_sum=-rate_sum)
+    return len(deleted)
+
+
+RECONCILE_SQL = text("""
+    UPDATE reviews AS r
+    SET comment_count = s.comment_count,
+        rate_count = s.rate_count,
+        rate_sum = s.rate_sum
+    FROM (
+        SELECT r2.review_id,
+               count(c.comment_id) AS comment_count,
+               count(c.rate) AS rate_count,
+               coalesce(sum(c.rate), 0) AS rate_sum
+        FROM reviews AS r2
+        LEFT JOIN comments AS c ON c.review_id = r2.review_id
+        WHERE r2.review_id >= :first_id AND r2.review_id < :end_id
+        GROUP BY r2.review_id
+    ) AS s
+    WHERE r.review_id = s.review_id
+      AND (r.comment_count, r.rate_count, r.rate_sum)
+          IS DISTINCT FROM (s.comment_count, s.rate_count, s.rate_sum)
+""")
+
+
+def reconcile_review_aggregates(db: Session, review_ids: Optional[Iterable[int]] = None, batch_size: int = 1000) -> int:
+    """Repair drifted counters, committing per batch of review ids. Returns the number of rows fixed."""
+    repaired = 0
+    if review_ids is not None:
+        for review_id in sorted(set(review_ids)):
+            repaired += db.execute(RECONCILE_SQL, {"first_id": review_id, "end_id": review_id + 1}).rowcount
+        db.commit()
+        return repaired
+
+    max_id = db.query(func.max(models.Review.review_id)).scalar() or 0
+    for first_id in range(1, max_id + 1, batch_size):
+        repaired += db.execute(RECONCILE_SQL, {"first_id": first_id, "end_id": first_id + batch_size}).rowcount
+        db.commit()
+    return repaired
+
+
+@handler("reconcile_reviews", queue="maintenance")
+def run_reconcile(review_ids: Optional[List[int]] = None) -> dict:
+    db = SessionLocal()
+    try:
+        return {"repaired": reconcile_review_aggregates(db, review_ids)}
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # Scheduled repair: python -m app.aggregates
+    session = SessionLocal()
+    try:
+        print(f"Reconciled {reconcile_review_aggregates(session)} review(s)")
+    finally:
+        session.close()
@@ -10,6 +10,62 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
 
+    # Connection pool, applied to both the sync and the async engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0  # 0 disables the per-statement timeout
+
+    # Principal cache used by oauth2.get_current_user
+    principal_cache_max_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+
+    # Password hashing executor used by login/register/update
+    bcrypt_rounds: int = 12
+    hashing_pool_workers: int = 4
+    hashing_pool_max_queue: int = 64
+
+    # Deepest reply level accepted by POST /comments (top-level comments are depth 0)
+    max_comment_depth: int = 50
+
+    # Background jobs (app/jobs.py): "queue:workers" pairs run by each process
+    job_queues: str = "default:2,maintenance:1"
+    job_poll_interval_seconds: float = 1.0
+    job_retry_base_seconds: float = 5.0
+    job_retry_max_seconds: float = 600.0
+    job_visibility_timeout_seconds: int = 1800  # a running job older than this is requeued
+    job_retention_hours: int = 72
+    account_deletion_batch_size: int = 5000
+    purge_batch_size: int = 1000  # rows per committed chunk when deleting threads and reviews
+
+    # Per-worker group membership index (app/membership.py). Changes are
+    # invalidated on every worker over realtime_channel; the TTL bounds
+    # staleness if a notification is missed
+    group_cache_max_size: int = 10000
+    group_cache_ttl_seconds: int = 30
+
+    # Real-time event outbox (app/outbox.py); dispatched rows are kept for
+    # outbox_retention_hours
+    outbox_batch_size: int = 200
+    outbox_poll_interval_seconds: float = 0.5
+    outbox_retention_hours: int = 24
+
+    # WebSocket fan-out: "inprocess" for a single worker, "postgres" to relay
+    # events between workers over LISTEN/NOTIFY
+    realtime_backend: str = "inprocess"
+    realtime_channel: str = "forunime_realtime"
+    realtime_batch_size: int = 100
+
+    # Per-connection outbound queue; on overflow a client is sent a resync
+    # frame ("resync") or disconnected ("drop")
+    websocket_send_queue_size: int = 256
+    websocket_overflow_policy: str = "resync"
+    # Resume replay for sockets reconnecting with last_cursor / last_message_id
+    websocket_replay_batch_size: int = 100
+    websocket_replay_max_events: int = 1000
+
     class Config:
         env_file = "../.env"  # if you're using a .env file for configuration
 
@@ -0,0 +1,106 @@
+from typing import Iterable
+from sqlalchemy import case, delete, func, literal, select, union, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import models
+
+# Maintenance of the conversations summary table. Everything here runs inside
+# the caller's transaction so the chat list moves together with the message
+# or membership change. Rows are always written in user_id order, so
+# concurrent writers lock them in the same order and cannot deadlock.
+
+Conversation = models.Conversation
+
+
+def _on_new_message(stmt, conflict_columns, conflict_where):
+    # A later message may commit before an earlier one, so only move forward
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        index_where=conflict_where,
+        set_={
+            "last_message_id": func.greatest(Conversation.last_message_id, stmt.excluded.last_message_id),
+            "last_activity_at": func.greatest(Conversation.last_activity_at, stmt.excluded.last_activity_at),
+            "unread_count": Conversation.unread_count + stmt.excluded.unread_count,
+        }
+    )
+
+
+async def record_message(db: AsyncSession, message: models.Message):
+    """Upsert the conversation rows touched by a newly flushed message."""
+    if message.group_id:
+        # Every member (and the owner) gets the group's row bumped with one statement
+        participants = union(
+            select(models.group_members.c.user_id).where(models.group_members.c.group_id == message.group_id),
+            select(models.Group.owner_id).where(models.Group.group_id == message.group_id)
+        ).subquery()
+        rows = select(
+            participants.c.user_id,
+            literal(message.group_id),
+            literal(message.message_id),
+            func.now(),
+            case((participants.c.user_id == message.sender_id, 0), else_=1)
+        ).order_by(participants.c.user_id)
+        stmt = insert(Conversation).from_select(
+            ["user_id", "group_id", "last_message_id", "last_activity_at", "unread_count"],
+            rows
+        )
+        stmt = _on_new_message(stmt, ["user_id", "group_id"], Conversation.group_id.isnot(None))
+    else:
+        values = [{
+            "user_id": message.sender_id,
+            "partner_id": message.receiver_id,
+            "last_message_id": message.message_id,
+            "last_activity_at": func.now(),
+            "unread_count": 0,
+        }]
+        if message.receiver_id != message.sender_id:
+            values.append({
+                "user_id": message.receiver_id,
+                "partner_id": message.sender_id,
+                "last_message_id": message.message_id,
+                "last_activity_at": func.now(),
+                "unread_count": 1,
+            })
+        values.sort(key=lambda row: row["user_id"])
+        stmt = _on_new_message(insert(Conversation).values(values), ["user_id", "partner_id"], Conversation.partner_id.isnot(None))
+
+    await db.execute(stmt)
+
+
+async def mark_read(db: AsyncSession, user_id: int, partner_id: int = None, group_id: int = None):
+    stmt = update(Conversation).where(Conversation.user_id == user_id)
+    if group_id is not None:
+        stmt = stmt.where(Conversation.group_id == group_id)
+    else:
+        stmt = stmt.where(Conversation.partner_id == partner_id)
+    await db.execute(stmt.values(unread_count=0))
+
+
+def join_group(db: Session, group_id: int, user_ids: Iterable[int]):
+    """Give users added to a group its chat list row, pointing at the latest message."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    latest = select(models.Message.message_id).where(
+        models.Message.group_id == group_id
+    ).order_by(models.Message.date_created.desc()).limit(1).scalar_subquery()
+    stmt = insert(Conversation).values([
+        {"user_id": user_id, "group_id": group_id, "last_message_id": latest}
+        for user_id in user_ids
+    ])
+    db.execute(stmt.on_conflict_do_nothing(
+        index_elements=["user_id", "group_id"],
+        index_where=Conversation.group_id.isnot(None)
+    ))
+
+
+def leave_group(db: Session, group_id: int, user_ids: Iterable[int]):
+    """Drop the group's chat list row of users no longer taking part in it."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    db.execute(delete(Conversation).where(
+        Conversation.group_id == group_id,
+        Conversation.user_id.in_(user_ids)
+    ))
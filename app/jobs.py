@@ -0,0 +1,204 @@
+import asyncio
+import inspect
+import json
+import logging
+import uuid
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy import event, text
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+# Durable background jobs.
+#
+# Handlers register a job kind with @handler. Request code calls enqueue()
+# inside its own transaction, so a job exists exactly when the change that
+# needed it was committed. Each worker process runs settings.job_queues
+# asyncio workers that claim due rows with FOR UPDATE SKIP LOCKED; a failed
+# job is retried with exponential backoff until max_attempts.
+
+logger = logging.getLogger(__name__)
+
+
+class JobHandler(NamedTuple):
+    fn: object
+    queue: str
+    max_attempts: int
+
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+def handler(kind: str, queue: str = "default", max_attempts: int = 5):
+    """Register fn(**payload) as the handler of a job kind; sync handlers run in a thread."""
+    def register(fn):
+        HANDLERS[kind] = JobHandler(fn, queue, max_attempts)
+        return fn
+    return register
+
+
+def enqueue(db, kind: str, *, requested_by: Optional[int] = None, **payload) -> models.Job:
+    """Add a job to the caller's sync or async session; it runs once the caller commits.
+
+    requested_by is the user allowed to read the job's status besides admins.
+    """
+    spec = HANDLERS[kind]
+    job = models.Job(
+        job_id=uuid.uuid4().hex,
+        queue=spec.queue,
+        kind=kind,
+        payload=payload,
+        max_attempts=spec.max_attempts,
+        requested_by=requested_by
+    )
+    db.add(job)
+    # Wake this process's workers instead of waiting for their next poll
+    session = getattr(db, "sync_session", db)
+    event.listen(session, "after_commit", lambda session: workers.wake(spec.queue), once=True)
+    return job
+
+
+CLAIM_SQL = text("""
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, started_at = now()
+    WHERE job_id = (
+        SELECT job_id FROM jobs
+        WHERE queue = :queue AND status = 'queued' AND run_after <= now()
+        ORDER BY run_after
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING job_id, kind, payload, attempts, max_attempts
+""")
+
+SUCCEED_SQL = text("""
+    UPDATE jobs
+    SET status = 'succeeded', result = CAST(:result AS jsonb), error = NULL, finished_at = now()
+    WHERE job_id = :job_id
+""")
+
+FAIL_SQL = text("""
+    UPDATE jobs
+    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+        run_after = now() + make_interval(secs => :delay),
+        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+        error = :error
+    WHERE job_id = :job_id
+""")
+
+# Jobs whose worker died mid-run go back to the queue (or fail, if out of attempts)
+REQUEUE_STALE_SQL = text("""
+    UPDATE jobs
+    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+        run_after = now(),
+        finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+        error = 'worker lost'
+    WHERE status = 'running' AND started_at < now() - make_interval(secs => :timeout)
+""")
+
+PURGE_FINISHED_SQL = text("""
+    DELETE FROM jobs
+    WHERE status IN ('succeeded', 'failed') AND finished_at < now() - make_interval(hours => :hours)
+""")
+
+
+def parse_queues(spec: str) -> Dict[str, int]:
+    # "default:2,maintenance:1" -> {"default": 2, "maintenance": 1}
+    queues = {}
+    for item in spec.split(","):
+        name, _, count = item.strip().partition(":")
+        if name:
+            queues[name] = int(count or 1)
+    return queues
+
+
+def retry_delay(attempts: int) -> float:
+    return min(settings.job_retry_base_seconds * 2 ** (attempts - 1), settings.job_retry_max_seconds)
+
+
+class JobWorkers:
+    """The asyncio workers of one process, with a per-queue concurrency limit."""
+
+    def __init__(self, queues: Dict[str, int]):
+        self.queues = queues
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._tasks = []
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        for queue, concurrency in self.queues.items():
+            self._wakeups[queue] = asyncio.Event()
+            for _ in range(concurrency):
+                self._tasks.append(asyncio.create_task(self._work(queue)))
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def wake(self, queue: str):
+        # Called after commit, possibly from a threadpool thread
+        if self._loop is not None and queue in self._wakeups:
+            self._loop.call_soon_threadsafe(self._wakeups[queue].set)
+
+    async def _work(self, queue: str):
+        wakeup = self._wakeups[queue]
+        while True:
+            try:
+                wakeup.clear()
+                async with AsyncSessionLocal() as db:
+                    job = (await db.execute(CLAIM_SQL, {"queue": queue})).first()
+                    await db.commit()
+                if job is None:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), settings.job_poll_interval_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job worker for queue %s failed", queue)
+                await asyncio.sleep(settings.job_poll_interval_seconds)
+
+    async def _run(self, job):
+        spec = HANDLERS.get(job.kind)
+        try:
+            if spec is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            if inspect.iscoroutinefunction(spec.fn):
+                result = await spec.fn(**job.payload)
+            else:
+                result = await asyncio.to_thread(spec.fn, **job.payload)
+        except Exception as error:
+            logger.exception("job %s (%s) failed on attempt %s", job.job_id, job.kind, job.attempts)
+            params = {"job_id": job.job_id, "delay": retry_delay(job.attempts), "error": repr(error)}
+            async with AsyncSessionLocal() as db:
+                await db.execute(FAIL_SQL, params)
+                await db.commit()
+            return
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(SUCCEED_SQL, {"job_id": job.job_id, "result": json.dumps(result, default=str)})
+            await db.commit()
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(60)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(REQUEUE_STALE_SQL, {"timeout": settings.job_visibility_timeout_seconds})
+                    await db.execute(PURGE_FINISHED_SQL, {"hours": settings.job_retention_hours})
+                    await db.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job maintenance failed")
+
+
+workers = JobWorkers(parse_queues(settings.job_queues))
@@ -1,13 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
 from .database import engine
-from .routers import auth, user, post, comment, thread, review, message, group
+from .migrations import verify_schema_version
+from . import outbox, realtime
+from .jobs import workers as job_workers
+from .routers import auth, user, post, comment, thread, review, message, group, admin, job
 from .config import settings
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    verify_schema_version(engine)
+    # One subscription per worker process
+    await realtime.backend.start(message.manager.deliver)
+    await outbox.dispatcher.start(message.manager)
+    await job_workers.start()
+    yield
+    await job_workers.stop()
+    await outbox.dispatcher.stop()
+    await realtime.backend.stop()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
@@ -27,6 +40,8 @@ app.include_router(thread.router)
 app.include_router(review.router)
 app.include_router(group.router)
 app.include_router(message.router)
+app.include_router(admin.router)
+app.include_router(job.router)
 
 @app.get("/")
 def read_root():
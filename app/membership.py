@@ -0,0 +1,91 @@
+import json
+from typing import FrozenSet, Iterable, NamedTuple, Optional
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import models
+from .cache import TTLCache
+from .config import settings
+
+# Per-worker index of group membership, used for message authorization and
+# WebSocket fan-out. The group routes and user deletion publish invalidations
+# over the realtime channel in the same transaction as the change, so every
+# worker drops its entry as soon as the change commits.
+
+
+class GroupMembership(NamedTuple):
+    group_id: int
+    group_name: str
+    owner_id: int
+    member_ids: FrozenSet[int]
+
+    def is_member(self, user_id: int) -> bool:
+        return user_id == self.owner_id or user_id in self.member_ids
+
+    @property
+    def recipient_ids(self) -> FrozenSet[int]:
+        return self.member_ids | {self.owner_id}
+
+
+membership_cache = TTLCache(
+    max_size=settings.group_cache_max_size,
+    ttl_seconds=settings.group_cache_ttl_seconds
+)
+
+
+def _group_query(group_id: int):
+    return select(models.Group.group_name, models.Group.owner_id).where(models.Group.group_id == group_id)
+
+
+def _members_query(group_id: int):
+    return select(models.group_members.c.user_id).where(models.group_members.c.group_id == group_id)
+
+
+def get_membership(db: Session, group_id: int) -> Optional[GroupMembership]:
+    """Membership of a group, or None if it does not exist."""
+    membership = membership_cache.get(group_id)
+    if membership is None:
+        group = db.execute(_group_query(group_id)).first()
+        if group is None:
+            return None
+        member_ids = frozenset(db.execute(_members_query(group_id)).scalars())
+        membership = GroupMembership(group_id, group.group_name, group.owner_id, member_ids)
+        membership_cache.set(group_id, membership)
+    return membership
+
+
+async def get_membership_async(db: AsyncSession, group_id: int) -> Optional[GroupMembership]:
+    membership = membership_cache.get(group_id)
+    if membership is None:
+        group = (await db.execute(_group_query(group_id))).first()
+        if group is None:
+            return None
+        member_ids = frozenset((await db.execute(_members_query(group_id))).scalars())
+        membership = GroupMembership(group_id, group.group_name, group.owner_id, member_ids)
+        membership_cache.set(group_id, membership)
+    return membership
+
+
+def invalidate_group(group_id: int):
+    membership_cache.invalidate(group_id)
+
+
+INVALIDATE_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+# Group ids per notification, well under the NOTIFY payload limit
+INVALIDATE_CHUNK_SIZE = 500
+
+
+def publish_invalidation(db: Session, group_ids: Iterable[int]):
+    """Invalidate the groups on every worker once the caller's transaction commits."""
+    group_ids = sorted(set(group_ids))
+    # NOTIFY is delivered on commit and dropped on rollback; the realtime
+    # listener of each worker hands it to ConnectionManager.deliver
+    for start in range(0, len(group_ids), INVALIDATE_CHUNK_SIZE):
+        payload = json.dumps([{"invalidate_groups": group_ids[start:start + INVALIDATE_CHUNK_SIZE]}])
+        db.execute(INVALIDATE_SQL, {"channel": settings.realtime_channel, "payload": payload})
+    # This worker may not be listening (in-process backend)
+    def invalidate_local(session):
+        for group_id in group_ids:
+            invalidate_group(group_id)
+    event.listen(db, "after_commit", invalidate_local, once=True)
@@ -0,0 +1,21 @@
+from pathlib import Path
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def verify_schema_version(engine):
+    # Startup only checks the revision; DDL is applied with `alembic upgrade head`
+    script = ScriptDirectory.from_config(Config(str(ALEMBIC_INI)))
+    expected = set(script.get_heads())
+
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {sorted(current) or 'none'}, "
+            f"expected {sorted(expected)}. Run 'alembic upgrade head'."
+        )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, UniqueConstraint, Table
-from sqlalchemy.orm import relationship, backref
-from sqlalchemy.sql.expression import text
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, ForeignKey, UniqueConstraint, CheckConstraint, Table, Index, Computed
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, backref, deferred
+from sqlalchemy.sql.expression import text, func
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 from .database import Base
 
@@ -9,7 +10,8 @@ group_members = Table(
     "group_members",
     Base.metadata,
     Column("group_id", Integer, ForeignKey("groups.group_id"), primary_key=True),
-    Column("user_id", Integer, ForeignKey("users.user_id"), primary_key=True)
+    Column("user_id", Integer, ForeignKey("users.user_id"), primary_key=True),
+    Index("ix_group_members_user_id", "user_id")
 )
 
 # Association Table for Group Co-Owners
@@ -17,7 +19,8 @@ group_co_owners = Table(
     "group_co_owners",
     Base.metadata,
     Column("group_id", Integer, ForeignKey("groups.group_id"), primary_key=True),
-    Column("user_id", Integer, ForeignKey("users.user_id"), primary_key=True)
+    Column("user_id", Integer, ForeignKey("users.user_id"), primary_key=True),
+    Index("ix_group_co_owners_user_id", "user_id")
 )
 
 class User(Base):
@@ -37,11 +40,18 @@ class User(Base):
     )
     role = Column(String, default='user')
 
+    __table_args__ = (
+        # Substring search in GET /users and prefix autocomplete (migration 0004)
+        Index('ix_users_username_trgm', 'username', postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'}),
+        Index('ix_users_username_lower', func.lower(username).collate('C')),
+    )
+
     # Relationships
     posts = relationship(
         'Post',
         back_populates='user',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         foreign_keys='Post.user_id'
     )
     profile_posts = relationship(
@@ -49,12 +59,13 @@ class User(Base):
         back_populates='profile_user',
         foreign_keys='Post.profile_user_id'
     )
-    comments = relationship('Comment', back_populates='user', cascade='all, delete-orphan')
+    comments = relationship('Comment', back_populates='user', cascade='all, delete-orphan', passive_deletes=True)
 
     reviews = relationship(
         'Review',
         back_populates='user',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         foreign_keys='Review.feedback_owner_id'
     )
     
@@ -81,13 +92,17 @@ class Group(Base):
     members = relationship("User", secondary=group_members, back_populates="groups")
     co_owners = relationship("User", secondary=group_co_owners, back_populates="co_owned_groups")
 
+    __table_args__ = (
+        Index('ix_groups_owner_id', 'owner_id'),
+    )
+
 class Message(Base):
     __tablename__ = "messages"
     message_id = Column(Integer, primary_key=True, nullable=False)
     content = Column(String, nullable=False)
     photo = Column(String, nullable=True)
     date_created = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
-    sender_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=True)  # NULL once the sender deletes their account
     receiver_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=True)
     group_id = Column(Integer, ForeignKey("groups.group_id"), nullable=True)
     deleted_for_receiver = Column(Boolean, default=False)
@@ -97,6 +112,96 @@ class Message(Base):
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="messages_received")
     group = relationship("Group", backref="messages")
 
+    # date_created comes back from the INSERT itself (RETURNING), so the
+    # real-time event can be built without reloading the row
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        Index('ix_messages_group_id_date_created', 'group_id', 'date_created'),
+        Index('ix_messages_sender_id_receiver_id_date_created', 'sender_id', 'receiver_id', 'date_created'),
+        Index('ix_messages_receiver_id_date_created', 'receiver_id', 'date_created'),
+    )
+
+
+# Chat list entry: one row per user and DM partner, and per user and group
+class Conversation(Base):
+    __tablename__ = "conversations"
+    conversation_id = Column(Integer, primary_key=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    partner_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=True)
+    group_id = Column(Integer, ForeignKey("groups.group_id", ondelete="CASCADE"), nullable=True)
+    last_message_id = Column(Integer, ForeignKey("messages.message_id", ondelete="SET NULL"), nullable=True)
+    last_activity_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    unread_count = Column(Integer, nullable=False, server_default=text('0'))
+
+    # Relationships
+    partner = relationship("User", foreign_keys=[partner_id])
+    group = relationship("Group", foreign_keys=[group_id])
+
+    __table_args__ = (
+        CheckConstraint('(partner_id IS NULL) <> (group_id IS NULL)', name='ck_conversations_partner_or_group'),
+        Index('uq_conversations_user_id_partner_id', 'user_id', 'partner_id', unique=True, postgresql_where=text('partner_id IS NOT NULL')),
+        Index('uq_conversations_user_id_group_id', 'user_id', 'group_id', unique=True, postgresql_where=text('group_id IS NOT NULL')),
+        Index('ix_conversations_user_id_last_activity_at', 'user_id', 'last_activity_at', 'conversation_id'),
+    )
+
+
+# Outbox of real-time message events; see app/outbox.py
+class MessageEvent(Base):
+    __tablename__ = "message_events"
+    seq = Column(BigInteger, primary_key=True, nullable=False)
+    message_id = Column(Integer, ForeignKey("messages.message_id", ondelete="CASCADE"), nullable=False)
+    group_id = Column(Integer, nullable=True)
+    user_id = Column(Integer, nullable=True)  # recipient of a direct message
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    dispatched_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    # Assigned from message_events_dispatch_seq when dispatched, so it follows
+    # commit order; the resume cursor of reconnecting sockets
+    dispatch_seq = Column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        Index('ix_message_events_pending', 'seq', postgresql_where=text('dispatched_at IS NULL')),
+        Index('ix_message_events_created_at', 'created_at'),
+        Index('ix_message_events_message_id', 'message_id'),
+        # Replay for reconnecting sockets (migration 0012)
+        Index('ix_message_events_dispatch_seq', 'dispatch_seq'),
+        Index(
+            'ix_message_events_user_id_dispatch_seq', 'user_id', 'dispatch_seq',
+            postgresql_where=text('user_id IS NOT NULL')
+        ),
+        Index(
+            'ix_message_events_group_id_dispatch_seq', 'group_id', 'dispatch_seq',
+            postgresql_where=text('group_id IS NOT NULL')
+        ),
+    )
+
+
+# Background job; see app/jobs.py
+class Job(Base):
+    __tablename__ = "jobs"
+    job_id = Column(String, primary_key=True, nullable=False)
+    queue = Column(String, nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    status = Column(String, nullable=False, default="queued", server_default="queued")
+    attempts = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    max_attempts = Column(Integer, nullable=False, default=5, server_default=text('5'))
+    run_after = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    # Who may read the job besides admins; NULL once that user is deleted
+    requested_by = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    result = Column(JSONB, nullable=True)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index('ix_jobs_queue_run_after', 'queue', 'run_after', postgresql_where=text("status = 'queued'")),
+        Index('ix_jobs_requested_by', 'requested_by'),
+        Index('ix_jobs_started_at', 'started_at', postgresql_where=text("status = 'running'")),
+        Index('ix_jobs_finished_at', 'finished_at'),
+    )
 
 class Post(Base):
     __tablename__ = "posts"
@@ -123,13 +228,25 @@ class Post(Base):
         ForeignKey("threads.thread_id", ondelete="CASCADE"),
         nullable=True
     )
+    # Full-text search document, maintained by Postgres (deferred: only search reads it)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed("to_tsvector('english', coalesce(content, ''))", persisted=True)
+    ))
     
     # Relationships
     user = relationship("User", back_populates="posts", foreign_keys=[user_id])
     profile_user = relationship("User", back_populates="profile_posts", foreign_keys=[profile_user_id])
-    comments = relationship('Comment', back_populates='post', cascade='all, delete-orphan')
+    comments = relationship('Comment', back_populates='post', cascade='all, delete-orphan', passive_deletes=True)
     thread = relationship('Thread', back_populates='posts', foreign_keys=[thread_id])
 
+    __table_args__ = (
+        Index('ix_posts_thread_id_date_created', 'thread_id', 'date_created'),
+        Index('ix_posts_profile_user_id_date_created', 'profile_user_id', 'date_created'),
+        Index('ix_posts_user_id', 'user_id'),
+        Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
 class Comment(Base):
     __tablename__ = "comments"
     comment_id = Column(Integer, primary_key=True, nullable=False)
@@ -161,6 +278,10 @@ class Comment(Base):
         nullable=True
     )
     rate = Column(Integer, nullable=True)  # Add this line
+    # Materialized ancestry: ids from the root down to this comment, each
+    # followed by '/', e.g. '12/57/301/'. Written once at insert time.
+    path = Column(String, nullable=False)
+    depth = Column(Integer, nullable=False, server_default=text('0'))
 
     # Relationships
     user = relationship("User", back_populates="comments")
@@ -169,7 +290,16 @@ class Comment(Base):
     replies = relationship(
         "Comment",
         backref=backref('parent', remote_side=[comment_id]),
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index('ix_comments_post_id_date_created', 'post_id', 'date_created'),
+        Index('ix_comments_review_id_date_created', 'review_id', 'date_created'),
+        Index('ix_comments_parent_comment_id', 'parent_comment_id'),
+        Index('ix_comments_user_id', 'user_id'),
+        Index('ix_comments_path', 'path', postgresql_ops={'path': 'text_pattern_ops'}),
     )
 
 
@@ -189,10 +319,12 @@ class Thread(Base):
     )
     
     # Relationships
-    posts = relationship('Post', back_populates='thread', cascade='all, delete-orphan')
+    # Child rows are removed by the ON DELETE CASCADE foreign keys, never loaded
+    posts = relationship('Post', back_populates='thread', cascade='all, delete-orphan', passive_deletes=True)
     
     __table_args__ = (
         UniqueConstraint('thread_name', name='unique_thread_name'),
+        Index('ix_threads_user_id', 'user_id'),
     )
 
 
@@ -218,12 +350,26 @@ class Review(Base):
         nullable=False
     )
     photo_url = Column(String, nullable=True)
+    # Rating counters kept up to date by the comment routes (see app/aggregates.py)
+    comment_count = Column(Integer, nullable=False, server_default=text('0'))
+    rate_count = Column(Integer, nullable=False, server_default=text('0'))
+    rate_sum = Column(Integer, nullable=False, server_default=text('0'))
+    # Full-text search document, name weighted above description
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True
+        )
+    ))
 
     # Relationships
     comments = relationship(
         "Comment",
         back_populates="review",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
     # Relationship to the user who wrote the review
@@ -233,14 +379,19 @@ class Review(Base):
         foreign_keys=[feedback_owner_id]
     )
 
+    __table_args__ = (
+        Index('ix_reviews_feedback_owner_id', 'feedback_owner_id'),
+        Index('ix_reviews_date_created', 'date_created'),
+        Index('ix_reviews_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
     # Computed properties
     @property
     def review_count(self):
-        return len(self.comments)
+        return self.comment_count
 
     @property
     def average_rate(self):
-        rates = [comment.rate for comment in self.comments if comment.rate is not None]
-        return sum(rates) / len(rates) if rates else 0
+        return self.rate_sum / self.rate_count if self.rate_count else 0
 
 
@@ -1,9 +1,12 @@
+import json
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from . import schemas, database, models
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session, make_transient_to_detached
+from .cache import TTLCache
 from .config import settings
 
 # OAuth2 password bearer
@@ -14,6 +17,14 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+# Detached User snapshots keyed by user_id, so authenticated requests can skip
+# the users lookup. Entries are dropped on every worker whenever the row
+# changes (publish_principal_invalidation).
+principal_cache = TTLCache(
+    max_size=settings.principal_cache_max_size,
+    ttl_seconds=settings.principal_cache_ttl_seconds
+)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -38,20 +49,45 @@ def verify_access_token(token: str, credentials_exception):
     return token_data
 
 
+def _snapshot_user(user: models.User) -> models.User:
+    # Copy the loaded columns onto a fresh instance that belongs to no session
+    snapshot = models.User(**{
+        attr.key: getattr(user, attr.key) for attr in inspect(models.User).column_attrs
+    })
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate(int(user_id))
+
+
+def publish_principal_invalidation(db: Session, user_id: int):
+    """Invalidate the user's cached principal on every worker once the caller's transaction commits."""
+    # Same channel as the membership invalidations; each worker's realtime
+    # listener hands it to ConnectionManager.deliver
+    payload = json.dumps([{"invalidate_principals": [int(user_id)]}])
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": settings.realtime_channel, "payload": payload})
+    event.listen(db, "after_commit", lambda session: invalidate_principal(user_id), once=True)
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"}
     )
-    print(f"Received token: {token}")  # Check the token received in the request
     token_data = verify_access_token(token, credentials_exception)
-    print(f"Token data: {token_data}")  # Check what is decoded from the token
-
-    user = db.query(models.User).filter(models.User.user_id == token_data.id).first()
-    if user is None:
-        raise credentials_exception
+    user_id = int(token_data.id)
 
-    print(f"Authenticated user: {user}")  # Ensure a user is found
-    return user
+    snapshot = principal_cache.get(user_id)
+    if snapshot is None:
+        user = db.query(models.User).filter(models.User.user_id == user_id).first()
+        if user is None:
+            raise credentials_exception
+        principal_cache.set(user_id, _snapshot_user(user))
+        return user
 
+    # Attach a per-request copy to this session without emitting any SQL, so
+    # relationship loads and identity comparisons keep working in the routes
+    return db.merge(snapshot, load=False)
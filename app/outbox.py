@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+# Transactional outbox for real-time message events.
+#
+# create_message writes a message_events row in the same transaction as the
+# message. One dispatcher at a time (an advisory lock held for the claim
+# transaction) takes undelivered rows in seq order and publishes them inside
+# that transaction: with the postgres backend the NOTIFYs are sent exactly
+# when the rows are marked dispatched, and not at all if the commit fails.
+# A worker whose listener is disconnected at that moment misses the event;
+# its clients catch up by replaying from message_events when they reconnect.
+# Each event carries its seq, which clients use to drop duplicates, and its
+# dispatch_seq as "cursor". Claims are serialized, so cursors follow commit
+# order (seq does not: a transaction can commit after one with a higher
+# seq); a reconnecting client resumes after the last cursor it saw.
+
+logger = logging.getLogger(__name__)
+
+
+def record(db: AsyncSession, message: models.Message, payload: dict):
+    """Add the event for a flushed message to the caller's transaction."""
+    db.add(models.MessageEvent(
+        message_id=message.message_id,
+        group_id=message.group_id,
+        user_id=None if message.group_id else message.receiver_id,
+        payload=payload
+    ))
+    # Deliver right after commit instead of at the next poll
+    event.listen(db.sync_session, "after_commit", lambda session: dispatcher.wake(), once=True)
+
+
+# Arbitrary key shared by every worker's dispatcher
+DISPATCH_LOCK_KEY = 0x6f7574626f78
+
+LOCK_SQL = text("SELECT pg_try_advisory_xact_lock(:key)")
+
+CLAIM_SQL = text("""
+    UPDATE message_events AS e
+    SET dispatched_at = now(), dispatch_seq = batch.dispatch_seq
+    FROM (
+        SELECT seq, nextval('message_events_dispatch_seq') AS dispatch_seq
+        FROM (
+            SELECT seq FROM message_events
+            WHERE dispatched_at IS NULL
+            ORDER BY seq
+            LIMIT :limit
+        ) AS pending
+    ) AS batch
+    WHERE e.seq = batch.seq
+    RETURNING e.seq, e.dispatch_seq, e.group_id, e.user_id, e.payload
+""")
+
+# Dispatched rows go as a prefix of dispatch_seq, always keeping the newest,
+# so a resume cursor below the oldest remaining row means events were purged
+PURGE_SQL = text("""
+    DELETE FROM message_events
+    WHERE dispatch_seq <= (
+        SELECT dispatch_seq FROM message_events
+        WHERE dispatched_at < now() - make_interval(hours => :hours)
+        ORDER BY dispatch_seq DESC
+        LIMIT 1
+    )
+    AND dispatch_seq < (SELECT max(dispatch_seq) FROM message_events)
+""")
+
+
+class OutboxDispatcher:
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self._manager = None
+        self._wakeup: asyncio.Event = None
+        self._loop = None
+        self._tasks = []
+        self.dispatched = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def start(self, manager):
+        self._manager = manager
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._purge())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def dispatch_batch(self) -> int:
+        async with AsyncSessionLocal() as db:
+            # Another worker is dispatching; it publishes these rows in order
+            if not (await db.execute(LOCK_SQL, {"key": DISPATCH_LOCK_KEY})).scalar():
+                return 0
+            rows = (await db.execute(CLAIM_SQL, {"limit": self.batch_size})).all()
+            events = []
+            for row in sorted(rows, key=lambda row: row.dispatch_seq):
+                payload = {**row.payload, "seq": row.seq, "cursor": row.dispatch_seq}
+                if row.group_id:
+                    events.append({"group_id": row.group_id, "message": payload})
+                else:
+                    events.append({"user_id": row.user_id, "message": payload})
+            if events:
+                await self._manager.backend.publish_in(db, events)
+            # Marks the rows dispatched, sends the NOTIFYs and releases the lock
+            await db.commit()
+        if rows:
+            self.dispatched += len(rows)
+            self.batches += 1
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                if await self.dispatch_batch() == self.batch_size:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.outbox_poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.exception("outbox dispatch failed")
+                await asyncio.sleep(settings.outbox_poll_interval_seconds)
+
+    async def _purge(self):
+        while True:
+            await asyncio.sleep(300)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(PURGE_SQL, {"hours": settings.outbox_retention_hours})
+                    await db.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("outbox purge failed")
+
+    def stats(self) -> dict:
+        return {
+            "dispatched": self.dispatched,
+            "batches": self.batches,
+            "errors": self.errors,
+            "batch_size": self.batch_size,
+        }
+
+
+dispatcher = OutboxDispatcher(batch_size=settings.outbox_batch_size)
@@ -0,0 +1,96 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import status, HTTPException
+from sqlalchemy import Float, cast, tuple_
+
+# Keyset pagination shared by the list routes.
+#
+# A page is ordered by `columns` (ending in a unique id as tie breaker).
+# `before` returns rows whose key sorts lower than the cursor, `after` rows
+# whose key sorts higher; e.g. on a newest-first list `before` scrolls back to
+# older rows. Cursors are opaque to clients.
+
+
+def encode_cursor(values) -> str:
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        decoded = []
+        for value, column in zip(values, columns):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            else:
+                decoded.append(python_type(value))
+        return decoded
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def _cursor_key(cursor: str, columns):
+    values = decode_cursor(cursor, columns)
+    # A float bound as-is is a float8; a real column (e.g. a search rank)
+    # would never compare equal to it, skipping the rows that tie with it
+    return tuple_(*(
+        cast(value, column.type) if isinstance(column.type, Float) else value
+        for value, column in zip(values, columns)
+    ))
+
+
+def _walks_backwards(before, after, descending):
+    # True when the requested rows sit before the cursor in list order
+    return after is not None if descending else before is not None
+
+
+def apply_keyset(query, columns, limit: int, before=None, after=None, descending=True):
+    """Add the cursor filter, ordering and limit to a Query or Select."""
+    key = tuple_(*columns)
+    if before is not None:
+        query = query.filter(key < _cursor_key(before, columns))
+    if after is not None:
+        query = query.filter(key > _cursor_key(after, columns))
+
+    backwards = _walks_backwards(before, after, descending)
+    ordering = [column.desc() if descending != backwards else column.asc() for column in columns]
+    # One extra row tells us whether another page exists
+    return query.order_by(*ordering).limit(limit + 1)
+
+
+def build_page(rows, columns, limit: int, before=None, after=None, descending=True, row_key=None) -> dict:
+    """Turn the rows fetched with apply_keyset into a Page payload."""
+    if row_key is None:
+        row_key = lambda row: [getattr(row, column.key) for column in columns]
+
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    backwards = _walks_backwards(before, after, descending)
+    if backwards:
+        rows.reverse()
+
+    has_cursor = before is not None or after is not None
+    more_after = True if backwards else has_more
+    more_before = has_more if backwards else has_cursor
+
+    return {
+        "items": rows,
+        "next_cursor": encode_cursor(row_key(rows[-1])) if rows and more_after else None,
+        "prev_cursor": encode_cursor(row_key(rows[0])) if rows and more_before else None,
+    }
+
+
+def paginate(query, columns, limit: int, before=None, after=None, descending=True, row_key=None) -> dict:
+    rows = apply_keyset(query, columns, limit, before, after, descending).all()
+    return build_page(rows, columns, limit, before, after, descending, row_key)
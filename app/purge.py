@@ -0,0 +1,64 @@
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+from . import models
+from .aggregates import delete_comment_rows
+from .config import settings
+from .database import SessionLocal
+from .jobs import handler
+
+# Background deletion of threads and reviews in bounded, separately committed
+# chunks, so no single statement or transaction grows with the size of the
+# thread. Comments go deepest first: a deleted comment never has replies
+# left, so its ON DELETE CASCADE has nothing to walk. A retried job simply
+# continues where the previous attempt stopped.
+
+
+def delete_comments(db: Session, criterion, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        paths = db.execute(
+            select(models.Comment.path).where(criterion)
+            .order_by(models.Comment.depth.desc()).limit(batch_size)
+        ).scalars().all()
+        if not paths:
+            return deleted
+        # Any reply still under these comments sits on another post or
+        # review; delete it here too so its counters are adjusted
+        deleted += delete_comment_rows(db, or_(*(models.Comment.path.like(f"{path}%") for path in paths)))
+        db.commit()
+
+
+@handler("delete_thread", queue="maintenance")
+def purge_thread(thread_id: int) -> dict:
+    batch_size = settings.purge_batch_size
+    db = SessionLocal()
+    try:
+        comments = posts = 0
+        while True:
+            post_ids = db.execute(
+                select(models.Post.post_id).where(models.Post.thread_id == thread_id).limit(batch_size)
+            ).scalars().all()
+            if not post_ids:
+                break
+            comments += delete_comments(db, models.Comment.post_id.in_(post_ids), batch_size)
+            db.execute(delete(models.Post).where(models.Post.post_id.in_(post_ids)))
+            db.commit()
+            posts += len(post_ids)
+
+        db.execute(delete(models.Thread).where(models.Thread.thread_id == thread_id))
+        db.commit()
+        return {"posts": posts, "comments": comments}
+    finally:
+        db.close()
+
+
+@handler("delete_review", queue="maintenance")
+def purge_review(review_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        comments = delete_comments(db, models.Comment.review_id == review_id, settings.purge_batch_size)
+        db.execute(delete(models.Review).where(models.Review.review_id == review_id))
+        db.commit()
+        return {"comments": comments}
+    finally:
+        db.close()
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import threading
+import psycopg
+from sqlalchemy import text
+from .config import settings
+from .database import SQLALCHEMY_DATABASE_URL
+
+# Pub/sub used by the WebSocket ConnectionManager.
+#
+# Events are dicts addressed either to one user ({"user_id": ..., "message": ...})
+# or to a group ({"group_id": ..., "message": ...}). Every worker subscribes
+# once and hands each event to its local deliver callback, which sends it to
+# whichever recipients are connected to that worker.
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7500
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+
+class BackendStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.published = 0
+        self.notifications_sent = 0
+        self.notifications_received = 0
+        self.references = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "published": self.published,
+                "notifications_sent": self.notifications_sent,
+                "notifications_received": self.notifications_received,
+                "references": self.references,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+
+class InProcessBackend:
+    """Single-worker mode: publishing delivers straight to local sockets."""
+
+    name = "inprocess"
+
+    def __init__(self):
+        self._deliver = None
+        self.stats = BackendStats()
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def publish(self, event: dict):
+        self.stats.add(published=1)
+        if self._deliver is not None:
+            await self._deliver([event])
+
+    async def publish_in(self, db, events: list):
+        self.stats.add(published=len(events))
+        if self._deliver is not None:
+            await self._deliver(events)
+
+
+class PostgresBackend:
+    """Cross-worker fan-out over LISTEN/NOTIFY.
+
+    Each worker keeps one listening connection and one publishing
+    connection. Events queued while a NOTIFY is in flight go out together,
+    packed into as few notifications as the payload limit allows. An event
+    too large to fit is replaced by a reference ({"ref": true, "message":
+    {"message_id": ..., "seq": ..., "cursor": ...}}) that the receiver
+    reloads from the database. The outbox uses publish_in instead, which
+    sends on the dispatcher's own transaction.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, channel: str, batch_size: int):
+        self._dsn = dsn
+        self._channel = channel
+        self._batch_size = batch_size
+        self._deliver = None
+        self._queue: asyncio.Queue = None
+        self._tasks = []
+        self.stats = BackendStats()
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._publish_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def publish(self, event: dict):
+        self.stats.add(published=1)
+        self._queue.put_nowait(event)
+
+    async def publish_in(self, db, events: list):
+        """NOTIFY on the caller's AsyncSession; the events go out only if it commits."""
+        self.stats.add(published=len(events))
+        chunks = self._pack(events)
+        for payload in chunks:
+            await db.execute(NOTIFY_SQL, {"channel": self._channel, "payload": payload})
+        self.stats.add(notifications_sent=len(chunks))
+
+    def _encode(self, event: dict) -> str:
+        payload = json.dumps(event, separators=(",", ":"), default=str)
+        if len(payload.encode()) <= MAX_PAYLOAD_BYTES:
+            return payload
+        if "message_id" not in event["message"]:
+            self.stats.add(dropped=1)
+            return None
+        reference = {key: value for key, value in event.items() if key != "message"}
+        reference["ref"] = True
+        reference["message"] = {
+            key: value for key, value in event["message"].items() if key in ("message_id", "seq", "cursor")
+        }
+        self.stats.add(references=1)
+        return json.dumps(reference, separators=(",", ":"))
+
+    def _pack(self, events) -> list:
+        # JSON arrays of encoded events, each array under the payload limit
+        chunks, current, size = [], [], 2
+        for event in events:
+            encoded = self._encode(event)
+            if encoded is None:
+                continue
+            if current and size + len(encoded.encode()) + 1 > MAX_PAYLOAD_BYTES:
+                chunks.append("[" + ",".join(current) + "]")
+                current, size = [], 2
+            current.append(encoded)
+            size += len(encoded.encode()) + 1
+        if current:
+            chunks.append("[" + ",".join(current) + "]")
+        return chunks
+
+    async def _publish_loop(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._dsn, autocommit=True) as conn:
+                    while True:
+                        events = [await self._queue.get()]
+                        while len(events) < self._batch_size and not self._queue.empty():
+                            events.append(self._queue.get_nowait())
+                        chunks = self._pack(events)
+                        try:
+                            # Notifications are sent together when the transaction commits
+                            async with conn.transaction():
+                                for payload in chunks:
+                                    await conn.execute("SELECT pg_notify(%s, %s)", (self._channel, payload))
+                        except psycopg.OperationalError:
+                            self.stats.add(dropped=len(events))
+                            raise
+                        self.stats.add(notifications_sent=len(chunks))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.add(errors=1)
+                logger.exception("realtime publisher failed, reconnecting")
+                await asyncio.sleep(1)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._dsn, autocommit=True) as conn:
+                    await conn.execute(f'LISTEN "{self._channel}"')
+                    async for notify in conn.notifies():
+                        self.stats.add(notifications_received=1)
+                        try:
+                            await self._deliver(json.loads(notify.payload))
+                        except Exception:
+                            self.stats.add(errors=1)
+                            logger.exception("realtime delivery failed")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.add(errors=1)
+                logger.exception("realtime listener failed, reconnecting")
+                await asyncio.sleep(1)
+
+
+def create_backend(name: str):
+    if name == "inprocess":
+        return InProcessBackend()
+    if name == "postgres":
+        return PostgresBackend(
+            SQLALCHEMY_DATABASE_URL,
+            channel=settings.realtime_channel,
+            batch_size=settings.realtime_batch_size
+        )
+    raise ValueError(f"Unknown realtime backend: {name}")
+
+
+backend = create_backend(settings.realtime_backend)
@@ -0,0 +1,64 @@
+from fastapi import status, HTTPException, Depends, APIRouter
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .. import models, schemas, oauth2, utils, database, outbox, realtime
+from .. import aggregates  # registers the reconcile_reviews job
+from ..jobs import enqueue
+from .message import manager
+
+router = APIRouter(
+    prefix="/admin",
+    tags=['Admin']
+)
+
+def require_admin(current_user: models.User = Depends(oauth2.get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can access this resource"
+        )
+    return current_user
+
+@router.get("/stats/principal-cache")
+def get_principal_cache_stats(current_user: models.User = Depends(require_admin)):
+    return oauth2.principal_cache.stats()
+
+@router.get("/stats/hashing-pool")
+def get_hashing_pool_stats(current_user: models.User = Depends(require_admin)):
+    return utils.hashing_pool.stats()
+
+@router.get("/stats/db-pool")
+def get_db_pool_stats(current_user: models.User = Depends(require_admin)):
+    return database.get_pool_stats()
+
+@router.get("/stats/realtime")
+def get_realtime_stats(current_user: models.User = Depends(require_admin)):
+    return {"backend": realtime.backend.name, **realtime.backend.stats.snapshot()}
+
+@router.get("/stats/websockets")
+async def get_websocket_stats(current_user: models.User = Depends(require_admin)):
+    return manager.stats()
+
+@router.get("/stats/outbox")
+async def get_outbox_stats(current_user: models.User = Depends(require_admin)):
+    return outbox.dispatcher.stats()
+
+@router.get("/stats/jobs")
+def get_job_stats(
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    rows = db.query(models.Job.queue, models.Job.status, func.count()).group_by(models.Job.queue, models.Job.status)
+    stats = {}
+    for queue, job_status, count in rows:
+        stats.setdefault(queue, {})[job_status] = count
+    return stats
+
+@router.post("/reviews/reconcile", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.JobOut)
+def reconcile_reviews(
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    job = enqueue(db, "reconcile_reviews", requested_by=current_user.user_id)
+    db.commit()
+    return job
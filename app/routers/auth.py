@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -7,12 +8,16 @@ from .. import database, schemas, models, utils, oauth2
 router = APIRouter(tags=['Authentication'])
 
 @router.post('/login', response_model=schemas.Token)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.email == user_credentials.username).first()
+    )
     if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials")
-    
-    if not utils.verify(user_credentials.password, user.password):
+
+    # bcrypt runs on the dedicated hashing pool, not on a request thread
+    valid, new_hash = await utils.verify_and_update_async(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials")
     
     access_token = oauth2.create_access_token(data={
@@ -24,5 +29,10 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
         "role": user.role,
     })
 
+    # The stored hash was made with a different bcrypt cost, replace it
+    if new_hash:
+        user.password = new_hash
+        await run_in_threadpool(db.commit)
+        oauth2.invalidate_principal(user.user_id)
 
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
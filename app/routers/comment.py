@@ -26,106 +26,6 @@
 #     tree = [comment for comment in comments if comment.parent_comment_id is None]
 #     return tree
 
-# def has_circular_reference(db, parent_id, child_id):
-#     current_id = parent_id
-#     while current_id:
-#         if current_id == child_id:
-#             return True
-#         parent_comment = db.query(models.Comment).filter(
-#             models.Comment.comment_id == current_id
-#         ).first()
-#         if parent_comment:
-#             current_id = parent_comment.parent_comment_id
-#         else:
-#             break
-#     return False
-
-# # Get comments for a post
-# @router.get("/posts/{post_id}", response_model=List[schemas.CommentOut])
-# def get_post_comments(
-#     post_id: int,
-#     db: Session = Depends(get_db),
-#     current_user: models.User = Depends(oauth2.get_current_user)
-# ):
-#     comments = db.query(models.Comment).options(
-#         joinedload(models.Comment.user)
-#     ).filter(
-#         models.Comment.post_id == post_id
-#     ).all()
-
-#     comment_tree = build_comment_tree(comments)
-#     return comment_tree
-
-# # Get comments for a review
-# @router.get("/reviews/{review_id}", response_model=List[schemas.CommentOut])
-# def get_review_comments(
-#     review_id: int,
-#     db: Session = Depends(get_db),
-#     current_user: models.User = Depends(oauth2.get_current_user)
-# ):
-#     comments = db.query(models.Comment).options(
-#         joinedload(models.Comment.user)
-#     ).filter(
-#         models.Comment.review_id == review_id
-#     ).all()
-
-#     comment_tree = build_comment_tree(comments)
-#     return comment_tree
-
-# # Create a comment for a post or review
-# @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.CommentOut)
-# def create_comment(
-#     comment: schemas.CommentCreate,
-#     db: Session = Depends(get_db),
-#     current_user: models.User = Depends(oauth2.get_current_user)
-# ):
-#     if not comment.post_id and not comment.review_id:
-#         raise HTTPException(
-#             status_code=400,
-#             detail="Either post_id or review_id must be provided."
-#         )
-
-#     if comment.post_id and comment.review_id:
-#         raise HTTPException(
-#             status_code=400,
-#             detail="Only one of post_id or review_id should be provided."
-#         )
-
-#     if comment.parent_comment_id:
-#         parent_comment = db.query(models.Comment).filter(
-#             models.Comment.comment_id == comment.parent_comment_id
-#         ).first()
-#         if not parent_comment:
-#             raise HTTPException(status_code=404, detail="Parent comment not found")
-
-#         if has_circular_reference(db, comment.parent_comment_id, child_id=None):
-#             raise HTTPException(
-#                 status_code=400,
-#                 detail="Circular reference detected in comment ancestry."
-#             )
-
-#     new_comment = models.Comment(
-#         user_id=current_user.user_id,
-#         **comment.dict()
-#     )
-#     db.add(new_comment)
-#     db.commit()
-#     db.refresh(new_comment)
-
-#     if comment.parent_comment_id:
-#         if has_circular_reference(db, comment.parent_comment_id, child_id=new_comment.comment_id):
-#             db.delete(new_comment)
-#             db.commit()
-#             raise HTTPException(
-#                 status_code=400,
-#                 detail="Circular reference detected in comment ancestry."
-#             )
-
-#     # Load user data
-#     new_comment.user = current_user
-
-#     return new_comment
-
 # # Get a specific comment
 # @router.get("/comment/{id}", response_model=schemas.CommentOut)
 # def get_comment(
@@ -204,80 +104,133 @@
 
 # routes/comment.py
 
-from fastapi import Response, status, HTTPException, Depends, APIRouter
+from fastapi import Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import Optional
 from .. import models, schemas, oauth2
+from ..aggregates import apply_review_delta, delete_comment_rows
+from ..config import settings
 from ..database import get_db
+from ..pagination import apply_keyset, build_page, decode_cursor, encode_cursor
 
 router = APIRouter(
     prefix="/comments",
     tags=['Comments']
 )
 
-def build_comment_tree(comments):
-    comment_dict = {}
-    for comment in comments:
-        comment.replies = []
-        comment_dict[comment.comment_id] = comment
-
-    for comment in comments:
-        if comment.parent_comment_id:
-            parent = comment_dict.get(comment.parent_comment_id)
-            if parent:
-                parent.replies.append(comment)
-
-    tree = [comment for comment in comments if comment.parent_comment_id is None]
-    return tree
-
-def has_circular_reference(db, parent_id, child_id):
-    current_id = parent_id
-    while current_id:
-        if current_id == child_id:
-            return True
-        parent_comment = db.query(models.Comment).filter(
-            models.Comment.comment_id == current_id
-        ).first()
-        if parent_comment:
-            current_id = parent_comment.parent_comment_id
-        else:
-            break
-    return False
-
-def update_review_rate(review_id: int, db: Session):
-    pass
+MAX_TREE_DEPTH = 10
+
+def comment_node(comment: models.Comment, more_replies: int = 0) -> dict:
+    # Plain dict so serializing never touches the lazy Comment.replies relationship
+    return {
+        "comment_id": comment.comment_id,
+        "content": comment.content,
+        "photo": comment.photo,
+        "date_created": comment.date_created,
+        "user_id": comment.user_id,
+        "user": comment.user,
+        "parent_comment_id": comment.parent_comment_id,
+        "post_id": comment.post_id,
+        "review_id": comment.review_id,
+        "rate": comment.rate,
+        "replies": [],
+        "more_replies": more_replies,
+        "replies_cursor": encode_cursor([comment.comment_id]) if more_replies else None,
+    }
+
+def load_comment_page(db: Session, roots_query, limit: int, before, after, depth: int) -> dict:
+    """Page the given top-level comments (oldest first) and attach their replies up to `depth` levels."""
+    root_columns = [models.Comment.date_created, models.Comment.comment_id]
+    root_rows = apply_keyset(roots_query, root_columns, limit, before, after, descending=False).all()
+    page = build_page(root_rows, root_columns, limit, before, after, descending=False)
+    roots = page["items"]
+    if not roots:
+        return page
+
+    # Roots on a page are siblings, so they all sit at the same depth. Each
+    # root's subtree is then one prefix range on ix_comments_path.
+    max_depth = roots[0].depth + depth
+    rows = db.query(models.Comment).filter(
+        or_(*[models.Comment.path.like(f"{root.path}%") for root in roots]),
+        models.Comment.depth <= max_depth
+    ).options(
+        joinedload(models.Comment.user)
+    ).order_by(models.Comment.date_created, models.Comment.comment_id).all()
+
+    # Count what was cut off below the deepest level we fetched
+    edge_ids = [comment.comment_id for comment in rows if comment.depth == max_depth]
+    truncated = {}
+    if edge_ids:
+        truncated = dict(
+            db.query(models.Comment.parent_comment_id, func.count(models.Comment.comment_id))
+            .filter(models.Comment.parent_comment_id.in_(edge_ids))
+            .group_by(models.Comment.parent_comment_id)
+            .all()
+        )
+
+    nodes = {comment.comment_id: comment_node(comment, truncated.get(comment.comment_id, 0)) for comment in rows}
+    root_ids = {root.comment_id for root in roots}
+    for comment in rows:
+        if comment.comment_id not in root_ids:
+            nodes[comment.parent_comment_id]["replies"].append(nodes[comment.comment_id])
+
+    page["items"] = [nodes[root.comment_id] for root in roots]
+    return page
+
+def comment_roots_query(db: Session):
+    return db.query(
+        models.Comment.comment_id,
+        models.Comment.date_created,
+        models.Comment.path,
+        models.Comment.depth
+    )
+
+def top_level_comments(db: Session):
+    return comment_roots_query(db).filter(models.Comment.parent_comment_id == None)
 
 # Get comments for a post
-@router.get("/posts/{post_id}", response_model=List[schemas.CommentOut])
+@router.get("/posts/{post_id}", response_model=schemas.Page[schemas.CommentTreeOut])
 def get_post_comments(
     post_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    depth: int = Query(3, ge=0, le=MAX_TREE_DEPTH),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    comments = db.query(models.Comment).options(
-        joinedload(models.Comment.user)
-    ).filter(
-        models.Comment.post_id == post_id
-    ).all()
-
-    comment_tree = build_comment_tree(comments)
-    return comment_tree
+    roots_query = top_level_comments(db).filter(models.Comment.post_id == post_id)
+    return load_comment_page(db, roots_query, limit, before, after, depth)
 
 # Get comments for a review
-@router.get("/reviews/{review_id}", response_model=List[schemas.CommentOut])
+@router.get("/reviews/{review_id}", response_model=schemas.Page[schemas.CommentTreeOut])
 def get_review_comments(
     review_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    depth: int = Query(3, ge=0, le=MAX_TREE_DEPTH),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    comments = db.query(models.Comment).options(
-        joinedload(models.Comment.user)
-    ).filter(
-        models.Comment.review_id == review_id
-    ).all()
-
-    comment_tree = build_comment_tree(comments)
-    return comment_tree
+    roots_query = top_level_comments(db).filter(models.Comment.review_id == review_id)
+    return load_comment_page(db, roots_query, limit, before, after, depth)
+
+# Continue a branch that was cut off by the depth limit
+@router.get("/replies", response_model=schemas.Page[schemas.CommentTreeOut])
+def get_comment_replies(
+    cursor: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    depth: int = Query(3, ge=0, le=MAX_TREE_DEPTH),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    parent_id, = decode_cursor(cursor, [models.Comment.comment_id])
+    roots_query = comment_roots_query(db).filter(models.Comment.parent_comment_id == parent_id)
+    return load_comment_page(db, roots_query, limit, before, after, depth)
 
 # Create a comment for a post or review
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.CommentOut)
@@ -298,30 +251,56 @@ def create_comment(
             detail="Only one of post_id or review_id should be provided."
         )
 
+    parent_path = ""
+    depth = 0
     if comment.parent_comment_id:
-        parent_comment = db.query(models.Comment).filter(
-            models.Comment.comment_id == comment.parent_comment_id
-        ).first()
+        parent_comment = db.query(
+            models.Comment.path,
+            models.Comment.depth,
+            models.Comment.post_id,
+            models.Comment.review_id
+        ).filter(models.Comment.comment_id == comment.parent_comment_id).first()
         if not parent_comment:
             raise HTTPException(status_code=404, detail="Parent comment not found")
 
-        if has_circular_reference(db, comment.parent_comment_id, child_id=None):
+        if parent_comment.post_id != comment.post_id or parent_comment.review_id != comment.review_id:
+            raise HTTPException(
+                status_code=400,
+                detail="Parent comment belongs to a different post or review."
+            )
+
+        if parent_comment.depth + 1 > settings.max_comment_depth:
             raise HTTPException(
                 status_code=400,
-                detail="Circular reference detected in comment ancestry."
+                detail=f"Replies cannot be nested more than {settings.max_comment_depth} levels deep."
             )
+        parent_path = parent_comment.path
+        depth = parent_comment.depth + 1
+
+    # Reserve the id up front so the row is inserted with its final path
+    comment_id = db.execute(select(func.nextval('comments_comment_id_seq'))).scalar()
 
     new_comment = models.Comment(
+        comment_id=comment_id,
         user_id=current_user.user_id,
+        path=f"{parent_path}{comment_id}/",
+        depth=depth,
         **comment.dict()
     )
     db.add(new_comment)
-    db.commit()
-    db.refresh(new_comment)
 
-    # Update the review's rate after adding the comment
+    # Update the review's counters in the same transaction
     if comment.review_id:
-        update_review_rate(comment.review_id, db)
+        apply_review_delta(
+            db,
+            comment.review_id,
+            comments=1,
+            rates=int(comment.rate is not None),
+            rate_sum=comment.rate or 0
+        )
+
+    db.commit()
+    db.refresh(new_comment)
 
     # Load user data
     new_comment.user = current_user
@@ -353,7 +332,8 @@ def delete_comment(
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     comment_query = db.query(models.Comment).filter(models.Comment.comment_id == id)
-    comment = comment_query.first()
+    # Lock the row so concurrent edits can't skew the review counters
+    comment = comment_query.with_for_update().first()
 
     if comment is None:
         raise HTTPException(
@@ -368,14 +348,11 @@ def delete_comment(
             detail="Not authorized to perform the requested action"
         )
 
-    review_id = comment.review_id
-    comment_query.delete(synchronize_session=False)
+    # Delete the whole subtree explicitly rather than through ON DELETE
+    # CASCADE, so every removed reply comes off its review's counters
+    delete_comment_rows(db, models.Comment.path.like(f"{comment.path}%"))
     db.commit()
 
-    # Update the review's rate after deleting the comment
-    if review_id:
-        update_review_rate(review_id, db)
-
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Update a comment
@@ -387,7 +364,8 @@ def update_comment(
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     comment_query = db.query(models.Comment).filter(models.Comment.comment_id == id)
-    comment = comment_query.first()
+    # Lock the row so the old rate we read is the one being replaced
+    comment = comment_query.with_for_update().first()
 
     if comment is None:
         raise HTTPException(
@@ -402,12 +380,20 @@ def update_comment(
             detail="Not authorized to perform the requested action"
         )
 
-    comment_query.update(updated_comment.dict(exclude_unset=True), synchronize_session=False)
-    db.commit()
+    changes = updated_comment.dict(exclude_unset=True)
 
-    # Update the review's rate after updating the comment
-    if comment.review_id:
-        update_review_rate(comment.review_id, db)
+    # Move the review's counters from the old rate to the new one
+    if comment.review_id and "rate" in changes:
+        old_rate, new_rate = comment.rate, changes["rate"]
+        apply_review_delta(
+            db,
+            comment.review_id,
+            rates=int(new_rate is not None) - int(old_rate is not None),
+            rate_sum=(new_rate or 0) - (old_rate or 0)
+        )
+
+    comment_query.update(changes, synchronize_session=False)
+    db.commit()
 
     updated_comment = comment_query.first()
     return updated_comment
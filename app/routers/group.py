@@ -1,25 +1,101 @@
-from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-from .. import models, schemas, oauth2
+from fastapi import Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import Integer, any_, delete, func, literal, select, union
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Optional
+from .. import models, schemas, oauth2, conversations, membership
 from ..database import get_db
+from ..pagination import paginate
 
 router = APIRouter(
     prefix="/groups",
     tags=['Groups']
 )
 
-@router.get("/", response_model=List[schemas.GroupOut])
+@router.get("/", response_model=schemas.Page[schemas.GroupSummaryOut])
 def get_groups(
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    groups = db.query(models.Group).options(
-        joinedload(models.Group.members), 
-        joinedload(models.Group.co_owners), 
-        joinedload(models.Group.owner)
-    ).all()
-    return groups
+    # Groups the current user owns, co-owns or belongs to; each branch has
+    # its own user_id index
+    my_group_ids = union(
+        select(models.Group.group_id).where(models.Group.owner_id == current_user.user_id),
+        select(models.group_co_owners.c.group_id).where(models.group_co_owners.c.user_id == current_user.user_id),
+        select(models.group_members.c.group_id).where(models.group_members.c.user_id == current_user.user_id)
+    )
+    member_count = select(func.count()).where(
+        models.group_members.c.group_id == models.Group.group_id
+    ).correlate(models.Group).scalar_subquery().label("member_count")
+
+    groups_query = db.query(
+        models.Group.group_id,
+        models.Group.group_name,
+        models.Group.date_created,
+        models.Group.owner_id,
+        models.User.username,
+        models.User.profile_picture_url,
+        member_count
+    ).join(models.User, models.User.user_id == models.Group.owner_id).filter(
+        models.Group.group_id.in_(my_group_ids)
+    )
+
+    # Newest first; next_cursor is passed back as `before`
+    page = paginate(
+        groups_query,
+        [models.Group.date_created, models.Group.group_id],
+        limit,
+        before=before,
+        after=after
+    )
+    page["items"] = [
+        {
+            **row._asdict(),
+            "owner": {
+                "user_id": row.owner_id,
+                "username": row.username,
+                "profile_picture_url": row.profile_picture_url
+            }
+        }
+        for row in page["items"]
+    ]
+    return page
+
+@router.get("/{id}/members", response_model=schemas.Page[schemas.UserBrief])
+def get_group_members(
+    id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    if membership.get_membership(db, id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Group with id: {id} was not found"
+        )
+
+    members_query = db.query(
+        models.User.user_id,
+        models.User.username,
+        models.User.profile_picture_url
+    ).join(models.group_members, models.group_members.c.user_id == models.User.user_id).filter(
+        models.group_members.c.group_id == id
+    )
+
+    # Ascending user_id, walking the (group_id, user_id) primary key
+    return paginate(
+        members_query,
+        [models.User.user_id],
+        limit,
+        before=before,
+        after=after,
+        descending=False
+    )
 
 @router.get("/{id}", response_model=schemas.GroupOut)
 def get_group(
@@ -70,6 +146,8 @@ def create_group(
 
     # Add members to the group
     new_group.members.extend(users)
+    conversations.join_group(db, new_group.group_id, member_ids)
+    membership.publish_invalidation(db, [new_group.group_id])
     db.commit()
 
     # Fetch the group with all relationships
@@ -80,15 +158,34 @@ def create_group(
     ).filter(models.Group.group_id == new_group.group_id).first()
     return group_with_members
 
-@router.put("/{id}", response_model=schemas.GroupOut)
+def _id_array(ids):
+    # One array parameter instead of one bind per id
+    return any_(literal(sorted(ids), ARRAY(Integer)))
+
+def _add_users(db: Session, table, group_id: int, user_ids):
+    if user_ids:
+        db.execute(
+            insert(table)
+            .values([{"group_id": group_id, "user_id": user_id} for user_id in sorted(user_ids)])
+            .on_conflict_do_nothing()
+        )
+
+def _remove_users(db: Session, table, group_id: int, user_ids):
+    if user_ids:
+        db.execute(
+            delete(table).where(table.c.group_id == group_id, table.c.user_id == _id_array(user_ids))
+        )
+
+@router.put("/{id}", response_model=schemas.GroupUpdateOut)
 def update_group(
     id: int,
     updated_group: schemas.GroupUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
+    # Row lock serializes concurrent updates of the same group
     group_query = db.query(models.Group).filter(models.Group.group_id == id)
-    group = group_query.first()
+    group = group_query.with_for_update().first()
 
     if not group:
         raise HTTPException(
@@ -105,39 +202,39 @@ def update_group(
     if updated_group.group_name:
         group_query.update({"group_name": updated_group.group_name}, synchronize_session=False)
 
-    if updated_group.add_member_ids:
-        for member_id in updated_group.add_member_ids:
-            user = db.query(models.User).filter(models.User.user_id == member_id).first()
-            if user and user not in group.members:
-                group.members.append(user)
-
-    if updated_group.remove_member_ids:
-        for member_id in updated_group.remove_member_ids:
-            user = db.query(models.User).filter(models.User.user_id == member_id).first()
-            if user and user in group.members:
-                group.members.remove(user)
-
-    if updated_group.add_co_owner_ids:
-        for co_owner_id in updated_group.add_co_owner_ids:
-            user = db.query(models.User).filter(models.User.user_id == co_owner_id).first()
-            if user and user not in group.co_owners:
-                group.co_owners.append(user)
-
-    if updated_group.remove_co_owner_ids:
-        for co_owner_id in updated_group.remove_co_owner_ids:
-            user = db.query(models.User).filter(models.User.user_id == co_owner_id).first()
-            if user and user in group.co_owners:
-                group.co_owners.remove(user)
+    add_member_ids = set(updated_group.add_member_ids or [])
+    remove_member_ids = set(updated_group.remove_member_ids or [])
+    add_co_owner_ids = set(updated_group.add_co_owner_ids or [])
+    remove_co_owner_ids = set(updated_group.remove_co_owner_ids or [])
+
+    # One lookup for every requested id; unknown ids are reported, not applied
+    requested_ids = add_member_ids | remove_member_ids | add_co_owner_ids | remove_co_owner_ids
+    existing_ids = set()
+    if requested_ids:
+        existing_ids = set(db.execute(
+            select(models.User.user_id).where(models.User.user_id == _id_array(requested_ids))
+        ).scalars())
 
+    _add_users(db, models.group_members, id, add_member_ids & existing_ids)
+    _remove_users(db, models.group_members, id, remove_member_ids & existing_ids)
+    # Chat list rows follow membership; the owner keeps the group regardless
+    conversations.join_group(db, id, add_member_ids & existing_ids)
+    conversations.leave_group(db, id, (remove_member_ids & existing_ids) - {group.owner_id})
+    _add_users(db, models.group_co_owners, id, add_co_owner_ids & existing_ids)
+    _remove_users(db, models.group_co_owners, id, remove_co_owner_ids & existing_ids)
+
+    membership.publish_invalidation(db, [id])
     db.commit()
 
     updated_group_with_members = db.query(models.Group).options(
-        joinedload(models.Group.members), 
-        joinedload(models.Group.co_owners), 
+        selectinload(models.Group.members),
+        selectinload(models.Group.co_owners),
         joinedload(models.Group.owner)
     ).filter(models.Group.group_id == id).first()
 
-    return updated_group_with_members
+    response = schemas.GroupUpdateOut.model_validate(updated_group_with_members)
+    response.missing_user_ids = sorted(requested_ids - existing_ids)
+    return response
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_group(
@@ -161,6 +258,7 @@ def delete_group(
         )
 
     group_query.delete(synchronize_session=False)
+    membership.publish_invalidation(db, [id])
     db.commit()
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,25 @@
+from fastapi import status, HTTPException, Depends, APIRouter
+from sqlalchemy.orm import Session
+from .. import models, schemas, oauth2
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=['Jobs']
+)
+
+# Readable by the user who started the job and by admins. A deleted
+# account's own deletion job is left to admins.
+@router.get("/{job_id}", response_model=schemas.JobOut)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    job = db.get(models.Job, job_id)
+    if not job or (job.requested_by != current_user.user_id and current_user.role != 'admin'):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id: {job_id} was not found"
+        )
+    return job
@@ -1,143 +1,461 @@
-from fastapi import Response, status, HTTPException, Depends, APIRouter, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from .. import models, schemas, oauth2
-from ..database import get_db
+import asyncio
+from fastapi import Response, status, HTTPException, Depends, APIRouter, Query, WebSocket, WebSocketDisconnect, WebSocketException
+from sqlalchemy import and_, delete, func, or_, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import Dict, List, Optional
+from .. import models, schemas, oauth2, conversations, membership, outbox, realtime
+from ..config import settings
+from ..database import get_async_db, AsyncSessionLocal
+from ..pagination import apply_keyset, build_page
 
 router = APIRouter(
     prefix="/messages",
     tags=['Messages']
 )
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}  # Maps user_id to WebSocket
+# Everything MessageOut serializes has to be loaded up front: async sessions
+# cannot lazy load. Only the group row is needed, never its member lists.
+MESSAGE_LOAD_OPTIONS = (
+    joinedload(models.Message.sender),
+    joinedload(models.Message.receiver),
+    joinedload(models.Message.group),
+)
+
+def _user_brief(user) -> Optional[dict]:
+    if user is None:
+        return None
+    return {
+        "user_id": user.user_id,
+        "username": user.username,
+        "profile_picture_url": user.profile_picture_url
+    }
+
+def message_event(message: models.Message, sender, receiver=None, group=None) -> dict:
+    """WebSocket payload for a message; sender/receiver are users, group anything with group_id and group_name."""
+    event = {
+        "message_id": message.message_id,
+        "content": message.content,
+        "date_created": message.date_created.isoformat(),
+        "sender": _user_brief(sender)
+    }
+    if group is not None:
+        event["group"] = {
+            "group_id": group.group_id,
+            "group_name": group.group_name
+        }
+    elif receiver is not None:
+        event["receiver"] = _user_brief(receiver)
+    return event
+
+class ClientConnection:
+    """A connected socket with its own bounded outbox, drained by a writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer: Optional[asyncio.Task] = None
+        # seqs already sent by the resume replay; live copies are skipped
+        self.replayed_seqs = set()
 
-    async def connect(self, websocket: WebSocket, user_id: int):
+
+class ConnectionManager:
+    """Sockets connected to this worker.
+
+    Sends go through the realtime backend, so a recipient connected to any
+    worker gets them; deliver() is the backend's callback on every worker.
+    Delivery only enqueues: each connection's writer task does the sending,
+    so one slow client never holds up the others. When a client falls
+    settings.websocket_send_queue_size messages behind it is either told to
+    resync (its backlog is replaced by a {"type": "resync"} frame and it
+    reloads history over HTTP) or disconnected, per
+    settings.websocket_overflow_policy.
+
+    A reconnecting client can pass the last cursor it saw; its writer is
+    held back while replay_missed_events() sends the gap, then live delivery
+    starts with whatever queued up meanwhile.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.active_connections: Dict[int, ClientConnection] = {}  # Maps user_id to its connection
+        self.enqueued = 0
+        self.sent = 0
+        self.send_errors = 0
+        self.resyncs = 0
+        self.dropped_connections = 0
+        self.replays = 0
+        self.replayed_events = 0
+        self.replay_resyncs = 0
+
+    async def connect(self, websocket: WebSocket, user_id: int, start_writer: bool = True) -> ClientConnection:
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        previous = self.active_connections.get(user_id)
+        if previous and previous.writer:
+            previous.writer.cancel()
+        connection = ClientConnection(websocket, settings.websocket_send_queue_size)
+        self.active_connections[user_id] = connection
+        if start_writer:
+            self.start_writer(user_id, connection)
+        return connection
+
+    def start_writer(self, user_id: int, connection: ClientConnection):
+        connection.writer = asyncio.create_task(self._write(user_id, connection))
 
     def disconnect(self, websocket: WebSocket, user_id: int):
-        if user_id in self.active_connections:
+        connection = self.active_connections.get(user_id)
+        if connection and connection.websocket is websocket:
             del self.active_connections[user_id]
+            if connection.writer:
+                connection.writer.cancel()
 
-    async def send_personal_message(self, message: dict, user_id: int):
-        websocket = self.active_connections.get(user_id)
-        if websocket:
-            await websocket.send_json(message)
+    async def _write(self, user_id: int, connection: ClientConnection):
+        while True:
+            message = await connection.queue.get()
+            if message.get("seq") in connection.replayed_seqs:
+                continue
+            try:
+                await connection.websocket.send_json(message)
+            except Exception:
+                self.send_errors += 1
+                self.disconnect(connection.websocket, user_id)
+                return
+            self.sent += 1
+
+    def _enqueue(self, user_id: int, message: dict):
+        connection = self.active_connections.get(user_id)
+        if connection is None:
+            return
+        try:
+            connection.queue.put_nowait(message)
+            self.enqueued += 1
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if settings.websocket_overflow_policy == "drop":
+            self.dropped_connections += 1
+            self.disconnect(connection.websocket, user_id)
+            asyncio.create_task(self._close(connection.websocket))
+            return
+
+        # Whatever was queued is stale; the client refetches it
+        while not connection.queue.empty():
+            connection.queue.get_nowait()
+        connection.queue.put_nowait({"type": "resync"})
+        self.resyncs += 1
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        depths = [connection.queue.qsize() for connection in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "queue_capacity": settings.websocket_send_queue_size,
+            "overflow_policy": settings.websocket_overflow_policy,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "send_errors": self.send_errors,
+            "resyncs": self.resyncs,
+            "dropped_connections": self.dropped_connections,
+            "replays": self.replays,
+            "replayed_events": self.replayed_events,
+            "replay_resyncs": self.replay_resyncs,
+        }
 
-    async def broadcast_to_group(self, message: dict, group_id: int, db: Session):
-        # Fetch all group members
-        group = db.query(models.Group).filter(models.Group.group_id == group_id).first()
-        if group:
-            for member in group.members:
-                websocket = self.active_connections.get(member.user_id)
-                if websocket:
-                    await websocket.send_json(message)
+    async def send_personal_message(self, message: dict, user_id: int):
+        await self.backend.publish({"user_id": user_id, "message": message})
+
+    async def broadcast_to_group(self, message: dict, group_id: int):
+        await self.backend.publish({"group_id": group_id, "message": message})
+
+    async def deliver(self, events: List[dict]):
+        # Membership and user changes committed on any worker
+        # (membership.publish_invalidation, oauth2.publish_principal_invalidation)
+        for event in events:
+            for group_id in event.get("invalidate_groups", ()):
+                membership.invalidate_group(group_id)
+            for user_id in event.get("invalidate_principals", ()):
+                oauth2.invalidate_principal(user_id)
+        events = [event for event in events if "message" in event]
+        if not events or not self.active_connections:
+            return
+        async with AsyncSessionLocal() as db:
+            for event in events:
+                message = event["message"]
+                if event.get("ref"):
+                    # Too large for a notification; reload it here
+                    result = await db.execute(
+                        select(models.Message).options(*MESSAGE_LOAD_OPTIONS)
+                        .where(models.Message.message_id == message["message_id"])
+                    )
+                    loaded = result.scalars().first()
+                    # Socket clients can publish too; only resolve a reference
+                    # to the conversation it was addressed to
+                    if loaded is None:
+                        continue
+                    if event.get("group_id") and loaded.group_id != event["group_id"]:
+                        continue
+                    if not event.get("group_id") and loaded.receiver_id != event["user_id"]:
+                        continue
+                    reloaded = message_event(loaded, loaded.sender, loaded.receiver, loaded.group)
+                    # Keep the outbox sequence number and cursor of the original event
+                    for key in ("seq", "cursor"):
+                        if key in message:
+                            reloaded[key] = message[key]
+                    message = reloaded
+
+                if event.get("group_id"):
+                    group = await membership.get_membership_async(db, event["group_id"])
+                    if group is None:
+                        continue
+                    recipients = group.recipient_ids
+                else:
+                    recipients = [event["user_id"]]
+
+                for user_id in recipients:
+                    self._enqueue(user_id, message)
+
+
+manager = ConnectionManager(realtime.backend)
+
+async def replay_missed_events(
+    connection: ClientConnection,
+    user_id: int,
+    last_cursor: Optional[int] = None,
+    last_message_id: Optional[int] = None
+):
+    """Send a reconnecting client the events after its last seen cursor (or message id).
+
+    Events come from the outbox in dispatch order, settings.websocket_replay_batch_size
+    at a time, through the per-recipient (user_id, dispatch_seq) /
+    (group_id, dispatch_seq) indexes. A gap larger than
+    settings.websocket_replay_max_events, or one reaching back past the outbox
+    retention, gets a resync frame instead. Events are sent with the message's
+    current content; messages the user has hidden are skipped.
+    """
+    events = models.MessageEvent
+    manager.replays += 1
+
+    async with AsyncSessionLocal() as db:
+        if last_cursor is None:
+            # The cursor the client would have had after that message
+            last_cursor = await db.scalar(
+                select(events.dispatch_seq).where(events.message_id == last_message_id)
+            )
 
+        if last_cursor is None:
+            # Purged, or not dispatched yet: nothing to resume from
+            purged = True
+        else:
+            oldest = await db.scalar(select(func.min(events.dispatch_seq)))
+            purged = oldest is not None and oldest > last_cursor + 1
+
+        if not purged:
+            group_ids = (await db.execute(union(
+                select(models.group_members.c.group_id).where(models.group_members.c.user_id == user_id),
+                select(models.Group.group_id).where(models.Group.owner_id == user_id)
+            ))).scalars().all()
+            addressed_to_user = or_(events.user_id == user_id, events.group_id.in_(group_ids))
+            pending = await db.scalar(
+                select(func.count()).select_from(
+                    select(events.seq).where(addressed_to_user, events.dispatch_seq > last_cursor)
+                    .limit(settings.websocket_replay_max_events + 1).subquery()
+                )
+            )
 
-manager = ConnectionManager()
+    if purged or pending > settings.websocket_replay_max_events:
+        manager.replay_resyncs += 1
+        await connection.websocket.send_json({"type": "resync"})
+        return
+
+    # The payload is frozen at send time; the message row has any later edit
+    # or tombstone, and whether the receiver has hidden it
+    hidden = and_(models.Message.deleted_for_receiver.is_(True), models.Message.receiver_id == user_id)
+    while True:
+        # Short-lived session per batch so a slow client never pins a pooled connection
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(
+                    events.seq, events.dispatch_seq, events.payload,
+                    models.Message.content, models.Message.sender_id, hidden.label("hidden")
+                )
+                .join(models.Message, models.Message.message_id == events.message_id)
+                .where(addressed_to_user, events.dispatch_seq > last_cursor)
+                .order_by(events.dispatch_seq).limit(settings.websocket_replay_batch_size)
+            )).all()
+        for row in rows:
+            if row.hidden:
+                continue
+            payload = {**row.payload, "content": row.content, "seq": row.seq, "cursor": row.dispatch_seq}
+            if row.sender_id is None:
+                payload["sender"] = None
+            await connection.websocket.send_json(payload)
+            connection.replayed_seqs.add(row.seq)
+            manager.replayed_events += 1
+        if len(rows) < settings.websocket_replay_batch_size:
+            return
+        last_cursor = rows[-1].dispatch_seq
 
 @router.websocket("/ws/messages/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = Depends(get_db)):
-    await manager.connect(websocket, user_id)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    user_id: int,
+    token: Optional[str] = None,
+    last_cursor: Optional[int] = None,
+    last_message_id: Optional[int] = None
+):
+    # Browsers cannot set headers on a WebSocket, so the access token comes
+    # as a query parameter; it must belong to the user whose messages are read
+    rejected = WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    if token is None or int(oauth2.verify_access_token(token, rejected).id) != user_id:
+        raise rejected
+    resuming = last_cursor is not None or last_message_id is not None
+    # While resuming, live events queue up unsent until the gap is replayed
+    connection = await manager.connect(websocket, user_id, start_writer=not resuming)
     try:
+        if resuming:
+            await replay_missed_events(connection, user_id, last_cursor, last_message_id)
+            manager.start_writer(user_id, connection)
         while True:
             data = await websocket.receive_json()
             # Determine if the message is for a group or personal chat
             if 'group_id' in data and data['group_id']:
-                await manager.broadcast_to_group(data, data['group_id'], db)
+                await manager.broadcast_to_group(data, data['group_id'])
             else:
                 # For personal messages, send to the receiver
                 receiver_id = data.get('receiver_id')
                 if receiver_id:
                     await manager.send_personal_message(data, receiver_id)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, user_id)
 
 
-
-@router.get("/chat-list", response_model=List[schemas.UserOut])
-def get_chatted_users(
-    db: Session = Depends(get_db),
+@router.get("/chat-list", response_model=schemas.Page[schemas.ConversationOut])
+async def get_chatted_users(
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    # Query messages where current_user is sender or receiver and collect unique users
-    messages = db.query(models.Message).filter(
-        (models.Message.sender_id == current_user.user_id) | 
-        (models.Message.receiver_id == current_user.user_id)
-    ).all()
-
-    chatted_user_ids = set()
-    for msg in messages:
-        if msg.sender_id != current_user.user_id:
-            chatted_user_ids.add(msg.sender_id)
-        if msg.receiver_id and msg.receiver_id != current_user.user_id:
-            chatted_user_ids.add(msg.receiver_id)
-    
-    if chatted_user_ids:
-        users = db.query(models.User).filter(models.User.user_id.in_(chatted_user_ids)).all()
-    else:
-        users = []
-    return users
+    # Most recently active conversations first, straight off
+    # ix_conversations_user_id_last_activity_at
+    columns = [models.Conversation.last_activity_at, models.Conversation.conversation_id]
+    query = select(models.Conversation).options(
+        joinedload(models.Conversation.partner),
+        joinedload(models.Conversation.group)
+    ).where(models.Conversation.user_id == current_user.user_id)
+
+    result = await db.execute(apply_keyset(query, columns, limit, before, after))
+    return build_page(result.scalars().all(), columns, limit, before, after)
+
+@router.post("/read", status_code=status.HTTP_204_NO_CONTENT)
+async def mark_conversation_read(
+    partner_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    if (partner_id is None) == (group_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of partner_id or group_id."
+        )
+    await conversations.mark_read(db, current_user.user_id, partner_id=partner_id, group_id=group_id)
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-@router.get("/", response_model=List[schemas.MessageOut])
-def get_messages(
+@router.get("/", response_model=schemas.MessagePage)
+async def get_messages(
     group_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    partner_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
+    if (group_id is None) == (partner_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of group_id or partner_id."
+        )
+
     if group_id:
         # Verify that the current user is a member of the group
-        group = db.query(models.Group).filter(models.Group.group_id == group_id).first()
+        group = await membership.get_membership_async(db, group_id)
         if not group:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Group with id: {group_id} not found."
             )
-        if current_user not in group.members and current_user != group.owner:
+        if not group.is_member(current_user.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You are not a member of this group."
             )
 
-        # Fetch all messages associated with the group
-        messages = db.query(models.Message).options(
-            joinedload(models.Message.sender),
-            joinedload(models.Message.receiver),
-            joinedload(models.Message.group)
-        ).filter(models.Message.group_id == group_id).order_by(models.Message.date_created.asc()).all()
+        # Messages of this group (ix_messages_group_id_date_created)
+        query = select(models.Message).where(models.Message.group_id == group_id)
     else:
-        # Fetch one-on-one messages where the user is either sender or receiver
-        messages = db.query(models.Message).options(
-            joinedload(models.Message.sender),
-            joinedload(models.Message.receiver),
-            joinedload(models.Message.group)
-        ).filter(
-            (models.Message.sender_id == current_user.user_id) | 
-            (models.Message.receiver_id == current_user.user_id)
-        ).order_by(models.Message.date_created.asc()).all()
-    
-    return messages
+        # One-on-one messages between the current user and this partner, each
+        # direction served by ix_messages_sender_id_receiver_id_date_created
+        query = select(models.Message).where(
+            ((models.Message.sender_id == current_user.user_id) & (models.Message.receiver_id == partner_id)) |
+            ((models.Message.sender_id == partner_id) & (models.Message.receiver_id == current_user.user_id))
+        )
+
+    # Newest first; next_cursor is passed back as `before` to scroll back
+    columns = [models.Message.date_created, models.Message.message_id]
+    result = await db.execute(apply_keyset(query, columns, limit, before, after))
+    page = build_page(result.scalars().all(), columns, limit, before, after)
+
+    # Side tables: each referenced user and group once per response
+    user_ids = {message.sender_id for message in page["items"]} | {message.receiver_id for message in page["items"]}
+    user_ids.discard(None)
+    page["users"] = []
+    if user_ids:
+        result = await db.execute(
+            select(
+                models.User.user_id,
+                models.User.username,
+                models.User.profile_picture_url
+            ).where(models.User.user_id.in_(user_ids))
+        )
+        page["users"] = result.all()
+
+    page["groups"] = []
+    if group_id:
+        page["groups"] = [{"group_id": group.group_id, "group_name": group.group_name}]
+
+    return page
 
 
 
 
 @router.get("/{id}", response_model=schemas.MessageOut)
-def get_message(
+async def get_message(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    message = db.query(models.Message).options(
-        joinedload(models.Message.sender),
-        joinedload(models.Message.receiver),
-        joinedload(models.Message.group)
-    ).filter(
-        models.Message.message_id == id,
-        (models.Message.sender_id == current_user.user_id) | 
-        (models.Message.receiver_id == current_user.user_id)
-    ).first()
+    result = await db.execute(
+        select(models.Message).options(*MESSAGE_LOAD_OPTIONS).where(
+            models.Message.message_id == id,
+            (models.Message.sender_id == current_user.user_id) |
+            (models.Message.receiver_id == current_user.user_id)
+        )
+    )
+    message = result.scalars().first()
 
     if not message:
         raise HTTPException(
@@ -152,19 +470,19 @@ def get_message(
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.MessageOut)
 async def create_message(
     message: schemas.MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     if message.group_id:
         # Validate that the group exists
-        group = db.query(models.Group).filter(models.Group.group_id == message.group_id).first()
+        group = await membership.get_membership_async(db, message.group_id)
         if not group:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Group not found."
             )
         # Validate that the current user is a member of the group
-        if current_user not in group.members and current_user != group.owner:
+        if not group.is_member(current_user.user_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You are not a member of this group."
@@ -182,74 +500,56 @@ async def create_message(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="receiver_id is required for one-on-one messages."
             )
-        receiver = db.query(models.User).filter(models.User.user_id == message.receiver_id).first()
+        receiver = await db.get(models.User, message.receiver_id)
         if not receiver:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Receiver not found."
             )
-    
+
     new_message = models.Message(
         sender_id=current_user.user_id,
         **message.dict(exclude_unset=True)
     )
     db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
-
-    message_with_details = db.query(models.Message).options(
-        joinedload(models.Message.sender),
-        joinedload(models.Message.receiver),
-        joinedload(models.Message.group)
-    ).filter(models.Message.message_id == new_message.message_id).first()
-    
-    # Broadcast the new message
-    if message_with_details.group:
-        await manager.broadcast_to_group({
-            "message_id": message_with_details.message_id,
-            "content": message_with_details.content,
-            "date_created": message_with_details.date_created.isoformat(),
-            "sender": {
-                "user_id": message_with_details.sender.user_id,
-                "username": message_with_details.sender.username,
-                "profile_picture_url": message_with_details.sender.profile_picture_url
-            },
-            "group": {
-                "group_id": message_with_details.group.group_id,
-                "group_name": message_with_details.group.group_name
-            }
-        }, message_with_details.group.group_id, db)
-    elif message_with_details.receiver:
-        await manager.send_personal_message({
-            "message_id": message_with_details.message_id,
-            "content": message_with_details.content,
-            "date_created": message_with_details.date_created.isoformat(),
-            "sender": {
-                "user_id": message_with_details.sender.user_id,
-                "username": message_with_details.sender.username,
-                "profile_picture_url": message_with_details.sender.profile_picture_url
-            },
-            "receiver": {
-                "user_id": message_with_details.receiver.user_id,
-                "username": message_with_details.receiver.username,
-                "profile_picture_url": message_with_details.receiver.profile_picture_url
-            }
-        }, message_with_details.receiver.user_id)
-
-    return message_with_details
+    await db.flush()
+
+    if message.group_id:
+        event = message_event(new_message, current_user, group=group)
+        group_brief = {"group_id": group.group_id, "group_name": group.group_name}
+        receiver = None
+    else:
+        event = message_event(new_message, current_user, receiver=receiver)
+        group_brief = None
+
+    # Chat list rows and the real-time event are written in the same
+    # transaction as the message; the outbox dispatcher delivers the event
+    await conversations.record_message(db, new_message)
+    outbox.record(db, new_message, event)
+    await db.commit()
+
+    # Everything the response needs is already in memory
+    return {
+        "message_id": new_message.message_id,
+        "content": new_message.content,
+        "date_created": new_message.date_created,
+        "sender": current_user,
+        "receiver": receiver,
+        "group": group_brief,
+        "deleted_for_receiver": False
+    }
 
 
 
 
 @router.put("/{id}", response_model=schemas.MessageOut)
-def update_message(
+async def update_message(
     id: int,
     updated_message: schemas.MessageUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    message_query = db.query(models.Message).filter(models.Message.message_id == id)
-    message = message_query.first()
+    message = await db.get(models.Message, id)
 
     if not message:
         raise HTTPException(
@@ -263,19 +563,24 @@ def update_message(
             detail="Not authorized to update this message"
         )
 
-    message_query.update(updated_message.dict(exclude_unset=True), synchronize_session=False)
-    db.commit()
+    for key, value in updated_message.dict(exclude_unset=True).items():
+        setattr(message, key, value)
+    await db.commit()
 
-    return message_query.first()
+    result = await db.execute(
+        select(models.Message).options(*MESSAGE_LOAD_OPTIONS)
+        .where(models.Message.message_id == id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_message(
+async def delete_message(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    message_query = db.query(models.Message).filter(models.Message.message_id == id)
-    message = message_query.first()
+    message = await db.get(models.Message, id)
 
     if not message:
         raise HTTPException(
@@ -284,14 +589,15 @@ def delete_message(
         )
 
     if message.sender_id == current_user.user_id:
-        message_query.delete(synchronize_session=False)
+        await db.execute(delete(models.Message).where(models.Message.message_id == id))
+        await db.commit()
     elif message.receiver_id == current_user.user_id:
         message.deleted_for_receiver = True
-        db.commit()
+        await db.commit()
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to delete this message"
         )
 
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,42 +1,145 @@
 # routes/post.py
 
-from fastapi import Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session, joinedload, subqueryload
-from typing import List, Optional
-from .. import models, schemas, oauth2
+from fastapi import Response, status, HTTPException, Depends, APIRouter, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, selectinload, subqueryload
+from typing import Optional
+from .. import models, schemas, oauth2, search as fts
 from ..database import get_db
+from ..pagination import paginate, apply_keyset, build_page
 
 router = APIRouter(
     prefix="/posts",
     tags=['Posts']
 )
 
-@router.get("/", response_model=List[schemas.PostOut])
+def filter_by_scope(posts_query, thread_id: Optional[int], profile_user_id: Optional[int]):
+    if thread_id is not None:
+        return posts_query.filter(models.Post.thread_id == thread_id)
+    if profile_user_id is not None:
+        return posts_query.filter(models.Post.profile_user_id == profile_user_id)
+    return posts_query.filter(models.Post.thread_id == None)
+
+@router.get("/", response_model=schemas.Page[schemas.PostOut])
 def get_posts(
     thread_id: Optional[int] = None,
     profile_user_id: Optional[int] = None,
     search: Optional[str] = "",
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
+    # selectinload keys the comment queries on the page's post ids only
     posts_query = db.query(models.Post).options(
         joinedload(models.Post.user),
-        subqueryload(models.Post.comments).joinedload(models.Comment.replies),
+        selectinload(models.Post.comments).joinedload(models.Comment.user),
+        selectinload(models.Post.comments).selectinload(models.Comment.replies),
         joinedload(models.Post.thread)
     )
 
+    posts_query = filter_by_scope(posts_query, thread_id, profile_user_id)
+
+    tsquery = fts.build_tsquery(search)
+    if tsquery is not None:
+        posts_query = posts_query.filter(fts.matches(models.Post.search_vector, tsquery))
+
+    # Newest first; next_cursor is passed back as `before` to load older posts
+    return paginate(
+        posts_query,
+        [models.Post.date_created, models.Post.post_id],
+        limit,
+        before=before,
+        after=after
+    )
+
+@router.get("/summary", response_model=schemas.Page[schemas.PostSummaryOut])
+def get_post_summaries(
+    thread_id: Optional[int] = None,
+    profile_user_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    # Feed view: post columns, author columns and a comment count in one query.
+    # The correlated count only runs for the rows on the page.
+    comment_count = select(func.count(models.Comment.comment_id)).where(
+        models.Comment.post_id == models.Post.post_id
+    ).correlate(models.Post).scalar_subquery().label("comment_count")
+
+    posts_query = db.query(
+        models.Post.post_id,
+        models.Post.content,
+        models.Post.photo,
+        models.Post.profile_user_id,
+        models.Post.thread_id,
+        models.Post.date_created,
+        models.Post.user_id,
+        models.User.username,
+        models.User.profile_picture_url,
+        comment_count
+    ).join(models.User, models.User.user_id == models.Post.user_id)
+    posts_query = filter_by_scope(posts_query, thread_id, profile_user_id)
+
+    # Newest first; next_cursor is passed back as `before`
+    page = paginate(
+        posts_query,
+        [models.Post.date_created, models.Post.post_id],
+        limit,
+        before=before,
+        after=after
+    )
+    page["items"] = [
+        {
+            **row._asdict(),
+            "user": {
+                "user_id": row.user_id,
+                "username": row.username,
+                "profile_picture_url": row.profile_picture_url
+            }
+        }
+        for row in page["items"]
+    ]
+    return page
+
+@router.get("/search", response_model=schemas.Page[schemas.PostSearchHit])
+def search_posts(
+    q: str,
+    thread_id: Optional[int] = None,
+    profile_user_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    tsquery = fts.build_tsquery(q)
+    if tsquery is None:
+        return {"items": []}
+
+    rank = fts.rank(models.Post.search_vector, tsquery).label("rank")
+    snippet = fts.headline(models.Post.content, tsquery).label("snippet")
+    posts_query = db.query(models.Post, rank, snippet).options(
+        joinedload(models.Post.user)
+    ).filter(fts.matches(models.Post.search_vector, tsquery))
+
     if thread_id is not None:
         posts_query = posts_query.filter(models.Post.thread_id == thread_id)
     elif profile_user_id is not None:
         posts_query = posts_query.filter(models.Post.profile_user_id == profile_user_id)
-    else:
-        posts_query = posts_query.filter(models.Post.thread_id == None)
-
-    if search:
-        posts_query = posts_query.filter(models.Post.content.contains(search))
 
-    posts = posts_query.all()
-    return posts
+    # Best match first; next_cursor is passed back as `before`
+    columns = [rank, models.Post.post_id]
+    rows = apply_keyset(posts_query, columns, limit, before, after).all()
+    page = build_page(rows, columns, limit, before, after, row_key=lambda row: [row.rank, row.Post.post_id])
+    page["items"] = [
+        schemas.PostSearchHit.model_validate(row.Post).model_copy(update={"rank": row.rank, "snippet": row.snippet})
+        for row in page["items"]
+    ]
+    return page
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.PostOut)
 def create_post(
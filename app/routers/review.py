@@ -1,10 +1,13 @@
 # routes/review.py
 
-from fastapi import Response, status, HTTPException, Depends, APIRouter
+from fastapi import status, HTTPException, Depends, APIRouter, Query
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from .. import models, schemas, oauth2
+from .. import models, schemas, oauth2, search as fts
+from .. import purge  # registers the delete_review job
 from ..database import get_db
+from ..jobs import enqueue
+from ..pagination import apply_keyset, build_page
 
 router = APIRouter(
     prefix="/reviews",
@@ -17,17 +20,47 @@ def get_reviews(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
+    # Rating counters are columns on reviews, so comments aren't loaded
     reviews_query = db.query(models.Review).options(
-        joinedload(models.Review.user),
-        joinedload(models.Review.comments)  # Eagerly load comments
+        joinedload(models.Review.user)
     )
 
-    if search:
-        reviews_query = reviews_query.filter(models.Review.description.contains(search))
+    tsquery = fts.build_tsquery(search)
+    if tsquery is not None:
+        reviews_query = reviews_query.filter(fts.matches(models.Review.search_vector, tsquery))
 
     reviews = reviews_query.all()
     return reviews
 
+@router.get("/search", response_model=schemas.Page[schemas.ReviewSearchHit])
+def search_reviews(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    tsquery = fts.build_tsquery(q)
+    if tsquery is None:
+        return {"items": []}
+
+    rank = fts.rank(models.Review.search_vector, tsquery).label("rank")
+    snippet = fts.headline(models.Review.description, tsquery).label("snippet")
+    reviews_query = db.query(models.Review, rank, snippet).options(
+        joinedload(models.Review.user)
+    ).filter(fts.matches(models.Review.search_vector, tsquery))
+
+    # Best match first; next_cursor is passed back as `before`
+    columns = [rank, models.Review.review_id]
+    rows = apply_keyset(reviews_query, columns, limit, before, after).all()
+    page = build_page(rows, columns, limit, before, after, row_key=lambda row: [row.rank, row.Review.review_id])
+    page["items"] = [
+        schemas.ReviewSearchHit.model_validate(row.Review).model_copy(update={"rank": row.rank, "snippet": row.snippet})
+        for row in page["items"]
+    ]
+    return page
+
 @router.get("/{id}", response_model=schemas.ReviewOut)
 def get_review(
     id: int,
@@ -35,8 +68,7 @@ def get_review(
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     review = db.query(models.Review).options(
-        joinedload(models.Review.user),
-        joinedload(models.Review.comments)  # Eagerly load comments
+        joinedload(models.Review.user)
     ).filter(models.Review.review_id == id).first()
     if not review:
         raise HTTPException(
@@ -101,7 +133,7 @@ def update_review(
 
     return updated_review_with_user
 
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{id}", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.JobOut)
 def delete_review(
     id: int,
     db: Session = Depends(get_db),
@@ -123,7 +155,7 @@ def delete_review(
             detail="Not authorized to perform the requested action"
         )
 
-    review_query.delete(synchronize_session=False)
+    # Comments go with it in the background; poll GET /jobs/{job_id}
+    job = enqueue(db, "delete_review", requested_by=current_user.user_id, review_id=id)
     db.commit()
-
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return job
@@ -1,7 +1,9 @@
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, status, HTTPException, Depends, APIRouter
 from sqlalchemy.orm import Session
 from .. import models, schemas, oauth2
+from .. import purge  # registers the delete_thread job
 from ..database import get_db
+from ..jobs import enqueue
 from typing import List
 
 router = APIRouter(
@@ -64,7 +66,7 @@ def create_thread(
     return new_thread
 
 # Delete a thread by ID
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{id}", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.JobOut)
 def delete_thread(id: int, db: Session = Depends(get_db), current_user: models.User = Depends(oauth2.get_current_user)):
     thread = db.query(models.Thread).filter(models.Thread.thread_id == id).first()
     
@@ -74,10 +76,10 @@ def delete_thread(id: int, db: Session = Depends(get_db), current_user: models.U
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can delete threads")
     
-    db.delete(thread)
+    # Posts and comments go with it in the background; poll GET /jobs/{job_id}
+    job = enqueue(db, "delete_thread", requested_by=current_user.user_id, thread_id=id)
     db.commit()
-
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return job
 
 
 # Update a thread by ID
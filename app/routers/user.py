@@ -1,9 +1,15 @@
 # routes/user.py
 
-from fastapi import Response, status, HTTPException, Depends, APIRouter
+from fastapi import status, HTTPException, Depends, APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 from .. import models, schemas, utils, oauth2
+from .. import accounts  # registers the delete_user job
 from ..database import get_db
+from ..jobs import enqueue
+from ..pagination import paginate
+from ..search import escape_like
 from typing import List, Optional
 
 
@@ -12,46 +18,78 @@ router = APIRouter(
     tags=['Users']
 )
 
-@router.get("/", response_model=List[schemas.UserOut])
+@router.get("/", response_model=schemas.Page[schemas.UserOut])
 def get_users(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user),
-    username: Optional[str] = None
+    username: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None
 ):
-    # If username is provided, filter by username
+    # If username is provided, return the best matches (trigram index backed)
     if username:
-        users = db.query(models.User).filter(models.User.username.ilike(f"%{username}%")).all()
-        if not users:
-            # Return empty list if no matches found
-            return []
-        return users
-    
-    # If no username is provided, return all users
-    users = db.query(models.User).all()
+        users = db.query(models.User).filter(
+            models.User.username.ilike(f"%{escape_like(username)}%")
+        ).order_by(
+            func.similarity(models.User.username, username).desc(),
+            models.User.username
+        ).limit(limit).all()
+        return {"items": users}
+
+    # If no username is provided, page through all users by id
+    return paginate(
+        db.query(models.User),
+        [models.User.user_id],
+        limit,
+        after=after,
+        descending=False
+    )
+
+@router.get("/autocomplete", response_model=List[schemas.UserBrief])
+def autocomplete_users(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=25),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    # Same expression as ix_users_username_lower, so the index serves both the
+    # prefix match and the ordering and the scan stops after `limit` rows
+    username_key = func.lower(models.User.username).collate('C')
+    users = db.query(
+        models.User.user_id,
+        models.User.username,
+        models.User.profile_picture_url
+    ).filter(
+        username_key.like(f"{escape_like(prefix.lower())}%")
+    ).order_by(username_key).limit(limit).all()
     return users
 
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # Check if email or username already exists
-    existing_user = db.query(models.User).filter(
-        (models.User.email == user.email) | (models.User.username == user.username)
-    ).first()
+    existing_user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(
+            (models.User.email == user.email) | (models.User.username == user.username)
+        ).first()
+    )
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email or username already registered"
         )
 
-    # Hash the password
-    hashed_password = utils.hash(user.password)
+    # Hash the password on the dedicated hashing pool
+    hashed_password = await utils.hash_async(user.password)
     user.password = hashed_password
 
-    new_user = models.User(**user.dict())
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    def save_user():
+        new_user = models.User(**user.dict())
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
 
-    return new_user
+    return await run_in_threadpool(save_user)
 
 @router.get('/{id}', response_model=schemas.UserOut)
 def get_user(id: int, db: Session = Depends(get_db)):
@@ -66,14 +104,14 @@ def get_user(id: int, db: Session = Depends(get_db)):
     return user
 
 @router.put('/{id}', response_model=schemas.UserOut)
-def update_user(
+async def update_user(
     id: int,
     updated_user: schemas.UserUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     user_query = db.query(models.User).filter(models.User.user_id == id)
-    user = user_query.first()
+    user = await run_in_threadpool(user_query.first)
 
     if user is None:
         raise HTTPException(
@@ -89,23 +127,25 @@ def update_user(
 
     # If the user is updating the password, hash the new password
     if updated_user.password:
-        hashed_password = utils.hash(updated_user.password)
+        hashed_password = await utils.hash_async(updated_user.password)
         updated_user.password = hashed_password
 
-    # Update user info
-    user_query.update(updated_user.dict(exclude_unset=True), synchronize_session=False)
-    db.commit()
+    def save_user():
+        # Update user info
+        user_query.update(updated_user.dict(exclude_unset=True), synchronize_session=False)
+        oauth2.publish_principal_invalidation(db, id)
+        db.commit()
+        return user_query.first()
 
-    return user_query.first()
+    return await run_in_threadpool(save_user)
 
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{id}", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.JobOut)
 def delete_user(
     id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    user_query = db.query(models.User).filter(models.User.user_id == id)
-    user = user_query.first()
+    user = db.query(models.User).filter(models.User.user_id == id).first()
 
     if user is None:
         raise HTTPException(
@@ -120,40 +160,7 @@ def delete_user(
             detail="Not authorized to delete this account"
         )
 
-    # Handling group ownership
-    owned_groups = db.query(models.Group).filter(models.Group.owner_id == id).all()
-    for group in owned_groups:
-        if group.co_owners:
-            # Promote the first co-owner to be the new owner
-            new_owner = group.co_owners[0]
-            group.owner_id = new_owner.user_id
-            db.commit()
-        else:
-            # If no co-owners, delete the group
-            db.delete(group)
-            db.commit()
-
-    # Remove the user from groups where they are a member
-    user_groups = db.query(models.Group).filter(models.Group.members.any(models.User.user_id == id)).all()
-    for group in user_groups:
-        group.members.remove(user)
+    # Runs in the background; poll GET /jobs/{job_id}
+    job = enqueue(db, "delete_user", requested_by=current_user.user_id, user_id=id)
     db.commit()
-
-    # Handling message deletion
-    messages_sent = db.query(models.Message).filter(models.Message.sender_id == id).all()
-    for message in messages_sent:
-        message.content = "[deleted]"
-        message.sender_id = None
-    db.commit()
-
-    # For messages where the user is the receiver, set deleted_for_receiver to True
-    messages_received = db.query(models.Message).filter(models.Message.receiver_id == id).all()
-    for message in messages_received:
-        message.deleted_for_receiver = True
-    db.commit()
-
-    # Delete user from the database
-    user_query.delete(synchronize_session=False)
-    db.commit()
-
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return job
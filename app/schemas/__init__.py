@@ -1,8 +1,10 @@
-from .user import UserCreate, UserLogin, UserOut, UserUpdate
-from .comment import CommentCreate, CommentOut, CommentUpdate, CommentBase
-from .post import PostCreate, PostOut, PostBase, PostUpdate
+from .user import UserCreate, UserLogin, UserOut, UserUpdate, UserBrief
+from .comment import CommentCreate, CommentOut, CommentUpdate, CommentBase, CommentTreeOut
+from .post import PostCreate, PostOut, PostBase, PostUpdate, PostSearchHit, PostSummaryOut
 from .thread import ThreadCreate, ThreadOut
-from .review import ReviewBase, ReviewCreate, ReviewOut, ReviewUpdate
-from .group import GroupCreate, GroupOut, GroupUpdate
-from .message import MessageCreate, MessageOut, MessageUpdate
+from .review import ReviewBase, ReviewCreate, ReviewOut, ReviewUpdate, ReviewSearchHit
+from .group import GroupCreate, GroupOut, GroupUpdate, GroupBrief, GroupUpdateOut, GroupSummaryOut
+from .message import MessageCreate, MessageOut, MessageUpdate, ConversationOut, MessageCompactOut, MessagePage
 from .token import Token, TokenData
+from .job import JobOut
+from .page import Page
@@ -43,3 +43,23 @@ class CommentOut(BaseModel):
 
 
 CommentOut.update_forward_refs()
+
+
+class CommentTreeOut(BaseModel):
+    comment_id: int
+    content: str
+    photo: Optional[str] = None
+    date_created: datetime
+    user_id: int
+    user: UserOut
+    parent_comment_id: Optional[int] = None
+    post_id: Optional[int] = None
+    review_id: Optional[int] = None
+    rate: Optional[int] = None
+    replies: List['CommentTreeOut'] = []
+    # Set when replies were cut off by the depth limit; pass replies_cursor to
+    # GET /comments/replies to load that branch
+    more_replies: int = 0
+    replies_cursor: Optional[str] = None
+
+    model_config = {"from_attributes": True}
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from .user import UserOut
+from .user import UserOut, UserBrief
 
 class GroupCreate(BaseModel):
     group_name: str
@@ -27,3 +27,20 @@ class GroupOut(BaseModel):
     date_created: datetime
 
     model_config = {"from_attributes": True}
+
+class GroupUpdateOut(GroupOut):
+    # Requested ids that do not belong to any user; they were skipped
+    missing_user_ids: List[int] = []
+
+class GroupBrief(BaseModel):
+    group_id: int
+    group_name: str
+
+    model_config = {"from_attributes": True}
+
+class GroupSummaryOut(BaseModel):
+    group_id: int
+    group_name: str
+    date_created: datetime
+    owner: UserBrief
+    member_count: int = 0
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Optional
+
+class JobOut(BaseModel):
+    job_id: str
+    queue: str
+    kind: str
+    status: str
+    attempts: int = 0
+    max_attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    model_config = {"from_attributes": True}
@@ -1,9 +1,10 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from .user import UserOut
-from .group import GroupOut
+from .user import UserOut, UserBrief
+from .group import GroupBrief
+from .page import Page
 
 class MessageOut(BaseModel):
     message_id: int
@@ -11,11 +12,29 @@ class MessageOut(BaseModel):
     date_created: datetime
     sender: Optional[UserOut] = None
     receiver: Optional[UserOut] = None
-    group: Optional[GroupOut] = None
+    group: Optional[GroupBrief] = None
     deleted_for_receiver: bool = False
 
     model_config = {"from_attributes": True}
 
+# History entries reference people and groups by id; the page carries each
+# referenced user and group once in its side tables
+class MessageCompactOut(BaseModel):
+    message_id: int
+    content: str
+    photo: Optional[str] = None
+    date_created: datetime
+    sender_id: Optional[int] = None
+    receiver_id: Optional[int] = None
+    group_id: Optional[int] = None
+    deleted_for_receiver: bool = False
+
+    model_config = {"from_attributes": True}
+
+class MessagePage(Page[MessageCompactOut]):
+    users: List[UserBrief] = []
+    groups: List[GroupBrief] = []
+
 class MessageCreate(BaseModel):
     content: str
     receiver_id: Optional[int] = None
@@ -27,3 +46,13 @@ class MessageUpdate(BaseModel):
     content: Optional[str] = None
 
     model_config = {"from_attributes": True}
+
+class ConversationOut(BaseModel):
+    conversation_id: int
+    partner: Optional[UserOut] = None
+    group: Optional[GroupBrief] = None
+    last_message_id: Optional[int] = None
+    last_activity_at: datetime
+    unread_count: int
+
+    model_config = {"from_attributes": True}
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Continue in list order with next_cursor and go back with prev_cursor,
+    # each passed as the route's before/after parameter
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
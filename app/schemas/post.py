@@ -3,7 +3,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
-from .user import UserOut
+from .user import UserOut, UserBrief
 from .comment import CommentOut
 
 # schemas/post.py
@@ -32,3 +32,21 @@ class PostOut(PostBase):
     class Config:
         orm_mode = True
 
+
+class PostSearchHit(PostBase):
+    post_id: int
+    date_created: datetime
+    user_id: int
+    user: UserOut
+    rank: float = 0.0
+    snippet: Optional[str] = None  # Matched fragments with <b> highlighting
+
+    class Config:
+        orm_mode = True
+
+class PostSummaryOut(PostBase):
+    post_id: int
+    date_created: datetime
+    user_id: int
+    user: UserBrief
+    comment_count: int = 0
@@ -33,3 +33,7 @@ class ReviewOut(ReviewBase):
     class Config:
         orm_mode = True
 
+
+class ReviewSearchHit(ReviewOut):
+    rank: float = 0.0
+    snippet: Optional[str] = None  # Matched fragments with <b> highlighting
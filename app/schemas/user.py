@@ -15,6 +15,13 @@ class UserOut(BaseModel):
     def format_date(cls, value):
         return value.strftime('%Y-%m-%d')
 
+class UserBrief(BaseModel):
+    user_id: int
+    username: str
+    profile_picture_url: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
 class UserCreate(BaseModel):
     email: EmailStr
     username: str
@@ -0,0 +1,44 @@
+import re
+from sqlalchemy import REAL, func
+
+# Postgres full-text search helpers for the posts and reviews search_vector
+# columns (see migration 0003)
+
+SEARCH_CONFIG = 'english'
+
+# Shorter terms are mostly stopwords or partial words, which the english
+# parser drops; those are matched as lexeme prefixes instead
+MIN_FTS_QUERY_LENGTH = 3
+
+HEADLINE_OPTIONS = 'MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<b>, StopSel=</b>'
+
+
+def build_tsquery(term: str):
+    """Return a tsquery expression for a user search term, or None if there is nothing to match."""
+    term = (term or "").strip()
+    if not term:
+        return None
+    if len(term) < MIN_FTS_QUERY_LENGTH:
+        token = re.sub(r"\W", "", term).lower()
+        if not token:
+            return None
+        return func.to_tsquery('simple', f"{token}:*")
+    return func.websearch_to_tsquery(SEARCH_CONFIG, term)
+
+
+def matches(search_vector, tsquery):
+    return search_vector.op('@@')(tsquery)
+
+
+def rank(search_vector, tsquery):
+    # ts_rank_cd returns real; typed as such so keyset cursors compare at that precision
+    return func.ts_rank_cd(search_vector, tsquery, type_=REAL)
+
+
+def headline(document, tsquery):
+    return func.ts_headline(SEARCH_CONFIG, document, tsquery, HEADLINE_OPTIONS)
+
+
+def escape_like(term: str) -> str:
+    # Make user input literal inside LIKE/ILIKE patterns (backslash is the default escape)
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -1,5 +1,19 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import status, HTTPException
 from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .config import settings
+
+# Pinning min/max to the configured cost makes verify_and_update hand back a
+# fresh hash whenever a stored hash was made with a different cost.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
 
 def hash(passwod: str):
     return pwd_context.hash(passwod)
@@ -7,4 +21,91 @@ def hash(passwod: str):
 def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+class HashingPool:
+    """Dedicated executor for bcrypt work.
+
+    bcrypt releases the GIL, so a small thread pool runs hashes in parallel
+    without occupying Starlette's shared threadpool. Submissions beyond
+    max_workers + max_queue are rejected immediately.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _call(self, fn, args):
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HashingPoolFull()
+            self.pending += 1
+        try:
+            future = self._executor.submit(self._call, fn, args)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        # Fires for cancelled futures too, so abandoned requests free their slot
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+hashing_pool = HashingPool(
+    max_workers=settings.hashing_pool_workers,
+    max_queue=settings.hashing_pool_max_queue
+)
+
+async def _run_hashing(fn, *args):
+    try:
+        return await hashing_pool.run(fn, *args)
+    except HashingPoolFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+async def hash_async(password: str):
+    return await _run_hashing(hash, password)
 
+async def verify_and_update_async(plain_password, hashed_password):
+    return await _run_hashing(verify_and_update, plain_password, hashed_password)
@@ -0,0 +1,33 @@
+import uuid
+import pytest
+from sqlalchemy import delete, select
+
+from app import models
+from app.database import SessionLocal
+
+# Runs against the database configured in the environment; skipped without one.
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        session.execute(select(1))
+    except Exception:
+        session.close()
+        pytest.skip("database not available")
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    name = f"test-{uuid.uuid4().hex[:12]}"
+    user = models.User(email=f"{name}@example.com", username=name, password="x")
+    db.add(user)
+    db.commit()
+    yield user
+    db.rollback()
+    # Everything the test created goes with the user (ON DELETE CASCADE)
+    db.execute(delete(models.User).where(models.User.user_id == user.user_id))
+    db.commit()
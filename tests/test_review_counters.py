@@ -0,0 +1,81 @@
+import uuid
+from sqlalchemy import func, select
+
+from app import models
+from app.aggregates import delete_comment_rows, reconcile_review_aggregates
+from app.purge import purge_thread
+
+
+def add_comment(db, user, parent=None, rate=None, **target):
+    comment_id = db.execute(select(func.nextval('comments_comment_id_seq'))).scalar()
+    comment = models.Comment(
+        comment_id=comment_id,
+        content="comment",
+        user_id=user.user_id,
+        parent_comment_id=parent.comment_id if parent else None,
+        path=f"{parent.path if parent else ''}{comment_id}/",
+        depth=parent.depth + 1 if parent else 0,
+        rate=rate,
+        **target
+    )
+    db.add(comment)
+    db.flush()
+    return comment
+
+
+def counters(db, review):
+    db.refresh(review)
+    return review.comment_count, review.rate_count, review.rate_sum
+
+
+def expected_counters(db, review):
+    return db.execute(
+        select(
+            func.count(models.Comment.comment_id),
+            func.count(models.Comment.rate),
+            func.coalesce(func.sum(models.Comment.rate), 0)
+        ).where(models.Comment.review_id == review.review_id)
+    ).one()
+
+
+def test_purge_thread_keeps_review_counters(db, user):
+    thread = models.Thread(thread_name=f"thread-{uuid.uuid4().hex}", user_id=user.user_id)
+    review = models.Review(name="review", type="anime", description="d", feedback_owner_id=user.user_id)
+    db.add_all([thread, review])
+    db.flush()
+    post = models.Post(content="post", user_id=user.user_id, thread_id=thread.thread_id)
+    db.add(post)
+    db.flush()
+
+    post_comment = add_comment(db, user, post_id=post.post_id)
+    add_comment(db, user, parent=post_comment, post_id=post.post_id)
+    add_comment(db, user, rate=4, review_id=review.review_id)
+    # A reply attached to the review under a post comment, as older rows may be
+    add_comment(db, user, parent=post_comment, rate=5, review_id=review.review_id)
+    db.commit()
+    reconcile_review_aggregates(db, [review.review_id])
+    assert counters(db, review) == (2, 2, 9)
+
+    purge_thread(thread.thread_id)
+
+    assert counters(db, review) == tuple(expected_counters(db, review)) == (1, 1, 4)
+
+
+def test_deleting_a_comment_subtree_adjusts_each_review(db, user):
+    first = models.Review(name="first", type="anime", description="d", feedback_owner_id=user.user_id)
+    second = models.Review(name="second", type="anime", description="d", feedback_owner_id=user.user_id)
+    db.add_all([first, second])
+    db.flush()
+
+    root = add_comment(db, user, rate=3, review_id=first.review_id)
+    add_comment(db, user, parent=root, rate=2, review_id=first.review_id)
+    add_comment(db, user, parent=root, rate=5, review_id=second.review_id)
+    add_comment(db, user, rate=1, review_id=second.review_id)
+    db.commit()
+    reconcile_review_aggregates(db, [first.review_id, second.review_id])
+
+    delete_comment_rows(db, models.Comment.path.like(f"{root.path}%"))
+    db.commit()
+
+    assert counters(db, first) == tuple(expected_counters(db, first)) == (0, 0, 0)
+    assert counters(db, second) == tuple(expected_counters(db, second)) == (1, 1, 1)
@@ -0,0 +1,31 @@
+import uuid
+
+from app import models
+from app.routers.post import search_posts
+
+
+def test_search_pages_through_tied_ranks(db, user):
+    thread = models.Thread(thread_name=f"thread-{uuid.uuid4().hex}", user_id=user.user_id)
+    db.add(thread)
+    db.flush()
+    # Identical content, so every hit has the same rank
+    posts = [
+        models.Post(content="quokka marmalade festival", user_id=user.user_id, thread_id=thread.thread_id)
+        for _ in range(7)
+    ]
+    db.add_all(posts)
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = search_posts(
+            q="quokka marmalade", thread_id=thread.thread_id, profile_user_id=None,
+            limit=3, before=cursor, after=None, db=db, current_user=user
+        )
+        seen += [hit.post_id for hit in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(set(seen)) == len(seen)
+    assert sorted(seen) == sorted(post.post_id for post in posts)